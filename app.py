@@ -1,20 +1,25 @@
 # ===================== Real Estate AI - Complete Application =====================
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, g, send_file, abort, Response
 import pandas as pd
 import numpy as np
 import joblib
 import os
+import io
+import csv
 import json
 import re
 import base64
 import uuid
 from datetime import datetime, timedelta
-from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
 from functools import wraps
 import hashlib
 import secrets
 import time
-from collections import defaultdict
+import threading
+import warnings
+import mimetypes
+from collections import defaultdict, OrderedDict, Counter
 import utils
 # or
 from utils import my_function
@@ -27,6 +32,17 @@ from utils.security import (
     is_suspicious_request
 )
 from database import db_manager
+from db_pool import install_connection_pool
+from dataset import LazyDataset, find_dataset_csv, unique_locations
+from search_index import LocationIndex, LocationMatcher
+from trends import TrendStore, stable_hash
+from images import ImagePipeline, ALLOWED_EXTENSIONS, DIGEST_PATTERN, digest_from_url
+from static_assets import fingerprint, precompressed_variant, precompress_tree
+from compression import CompressionMiddleware
+from loans import (
+    MAX_TENURE_MONTHS, MAX_GRID_POINTS, monthly_emi, amortization_schedule, schedule_summary,
+    schedule_to_dict, rate_tenure_grid, validate_loan_terms
+)
 from utils.analytics import analytics_manager, track_page_view, track_feature_usage, get_dashboard_analytics
 from utils.notifications import notification_manager, send_property_inquiry, send_rental_booking
 from utils.amenities import amenities_manager, get_location_amenities
@@ -41,6 +57,113 @@ app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['PERMANENT_SESSION_LIFETIME'] = 3600  # 1 hour
 
+# Prediction configurations
+app.config['PREDICTION_DETERMINISTIC'] = os.environ.get('PREDICTION_DETERMINISTIC', 'true').lower() == 'true'
+app.config['PREDICTION_CACHE_SIZE'] = int(os.environ.get('PREDICTION_CACHE_SIZE', 4096))
+app.config['PREDICTION_CACHE_TTL'] = int(os.environ.get('PREDICTION_CACHE_TTL', 3600))  # 1 hour
+
+# Session validation cache, opt-in: invalidation only reaches the worker that handled the logout/block,
+# so other workers may accept a revoked token for up to this many seconds (per-request memoization always applies)
+app.config['SESSION_CACHE_TTL'] = int(os.environ.get('SESSION_CACHE_TTL', 0))
+app.config['SESSION_CACHE_SIZE'] = int(os.environ.get('SESSION_CACHE_SIZE', 10000))
+app.config['SESSION_SWEEP_INTERVAL'] = int(os.environ.get('SESSION_SWEEP_INTERVAL', 900))  # 15 minutes, 0 disables
+app.config['CHAT_IDLE_HOURS'] = int(os.environ.get('CHAT_IDLE_HOURS', 24))  # Idle chat histories are swept after this
+app.config['ANONYMOUS_HISTORY_IDLE_HOURS'] = int(os.environ.get('ANONYMOUS_HISTORY_IDLE_HOURS', 168))  # Anonymous prediction histories
+
+# Amenities lookup cache
+app.config['AMENITIES_CACHE_TTL'] = int(os.environ.get('AMENITIES_CACHE_TTL', 21600))  # 6 hours
+app.config['AMENITIES_CACHE_SIZE'] = int(os.environ.get('AMENITIES_CACHE_SIZE', 2048))
+app.config['AMENITIES_WARMUP'] = os.environ.get('AMENITIES_WARMUP', 'false').lower() == 'true'
+
+# Background image processing for listing uploads
+app.config['IMAGE_WORKERS'] = int(os.environ.get('IMAGE_WORKERS', 2))
+app.config['MAX_PROPERTY_IMAGES'] = 5
+app.config['MAX_RENTAL_IMAGES'] = 10
+app.config['STATIC_MAX_AGE'] = int(os.environ.get('STATIC_MAX_AGE', 3600))  # Unversioned assets
+app.config['UPLOADS_MAX_AGE'] = int(os.environ.get('UPLOADS_MAX_AGE', 86400))  # Legacy (non content-addressed) uploads
+app.config['IMAGE_GC_GRACE_HOURS'] = int(os.environ.get('IMAGE_GC_GRACE_HOURS', 24))  # Unreferenced blobs younger than this are kept
+
+# Response compression (gzip, or brotli when installed) for JSON/HTML/CSV bodies
+app.config['COMPRESSION_ENABLED'] = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+app.config['COMPRESSION_MIN_SIZE'] = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))  # Smaller bodies are sent as-is
+
+if app.config['COMPRESSION_ENABLED']:
+    app.wsgi_app = CompressionMiddleware(app.wsgi_app, min_size=app.config['COMPRESSION_MIN_SIZE'])
+
+# Reuse WAL-mode SQLite connections for every db_manager call
+db_pool = install_connection_pool(db_manager)
+
+# ===================== CACHING =====================
+
+class TTLCache:
+    """Bounded LRU cache with per-entry TTL and hit/miss counters"""
+
+    def __init__(self, max_size=4096, ttl_seconds=3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def __contains__(self, key):
+        """Live-entry check that does not touch the hit/miss counters"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[1] > time.monotonic()
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_where(self, predicate):
+        """Drop every entry whose value matches predicate"""
+        with self._lock:
+            for key in [k for k, (value, _) in self._entries.items() if predicate(value)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0
+            }
+
+prediction_cache = TTLCache(app.config['PREDICTION_CACHE_SIZE'], app.config['PREDICTION_CACHE_TTL'])
+session_cache = TTLCache(app.config['SESSION_CACHE_SIZE'], app.config['SESSION_CACHE_TTL'])
+amenities_cache = TTLCache(app.config['AMENITIES_CACHE_SIZE'], app.config['AMENITIES_CACHE_TTL'])
+
 # User authentication decorator
 def login_required(f):
     """Decorator to require user login"""
@@ -54,7 +177,7 @@ def login_required(f):
             return redirect(url_for('login'))
 
         # Validate session
-        result = db_manager.validate_session(session_token)
+        result = validate_user_session(session_token)
         if not result['success']:
             session.clear()
             # Check if this is an AJAX request (expecting JSON response)
@@ -67,13 +190,39 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def validate_user_session(session_token):
+    """Validate a session token at most once per request, with a short-TTL in-process cache"""
+    validated = g.setdefault('validated_sessions', {})
+    if session_token in validated:
+        return validated[session_token]
+
+    result = session_cache.get(session_token) if app.config['SESSION_CACHE_TTL'] > 0 else None
+    if result is None:
+        result = db_manager.validate_session(session_token)
+        # Only successful validations are shared across requests
+        if result['success'] and app.config['SESSION_CACHE_TTL'] > 0:
+            session_cache.set(session_token, result)
+
+    validated[session_token] = result
+    return result
+
+def invalidate_user_sessions(user_id=None, session_token=None):
+    """Drop cached validations for one token, one user, or everyone (no arguments)"""
+    if session_token:
+        session_cache.delete(session_token)
+    if user_id is not None:
+        session_cache.delete_where(lambda result: str(result['user']['id']) == str(user_id))
+    if session_token is None and user_id is None:
+        session_cache.clear()
+    g.pop('validated_sessions', None)
+
 def get_current_user():
     """Get current logged-in user"""
     session_token = session.get('user_session_token')
     if not session_token:
         return None
 
-    result = db_manager.validate_session(session_token)
+    result = validate_user_session(session_token)
     if result['success']:
         return result['user']
     return None
@@ -142,12 +291,158 @@ def log_admin_action(action, details=None):
 
 # Global variables for model and data
 model = None
-df = None
+feature_encoder = None
+dataset = None
 locations = []
+location_index = LocationIndex([])
+location_matcher = LocationMatcher()
+trend_store = TrendStore()
+
+class FeatureEncoder:
+    """Maps property inputs onto the model's feature columns.
+
+    The lookup tables are built once from ``model.feature_names_in_`` so each
+    request only fills a reused row buffer instead of rebuilding a one-hot frame.
+    """
+
+    NUMERIC_ALIASES = {
+        'total_sqft': 'total_sqft',
+        'sqft': 'total_sqft',
+        'bath': 'bath',
+        'bathrooms': 'bath',
+        'balcony': 'balcony',
+        'bhk': 'bhk',
+        'size': 'bhk'
+    }
+
+    def __init__(self, feature_names, locations=()):
+        self.feature_names = [str(name) for name in feature_names]
+        self.width = len(self.feature_names)
+        self.numeric_index = {}
+        self.location_index = {}
+        self.area_type_index = {}
+        self.unmapped = []
+        known_locations = {str(location).strip().lower() for location in locations}
+
+        for i, name in enumerate(self.feature_names):
+            key = name.strip().lower()
+            if key in self.NUMERIC_ALIASES:
+                self.numeric_index[self.NUMERIC_ALIASES[key]] = i
+            elif key.startswith('area_type_'):
+                self.area_type_index[key[len('area_type_'):]] = i
+            elif key.startswith('location_'):
+                self.location_index[key[len('location_'):]] = i
+            elif key in known_locations:
+                # Bare one-hot columns (pd.get_dummies without a prefix)
+                self.location_index[key] = i
+            else:
+                self.unmapped.append(name)
+
+        self._local = threading.local()
+
+    @classmethod
+    def from_model(cls, model, locations=()):
+        """Build an encoder for a fitted model, or None if any of its columns is unknown"""
+        feature_names = getattr(model, 'feature_names_in_', None)
+        if feature_names is None or not hasattr(model, 'predict'):
+            return None
+        encoder = cls(feature_names, locations)
+        if encoder.unmapped:
+            print(f"⚠️ Feature encoder disabled, unknown model columns: {encoder.unmapped[:5]}")
+            return None
+        return encoder
+
+    @staticmethod
+    def parse_bhk(size):
+        match = re.search(r'(\d+)', str(size))
+        return float(match.group(1)) if match else 2.0
+
+    def _row_buffer(self):
+        buffer = getattr(self._local, 'row', None)
+        if buffer is None:
+            buffer = np.zeros((1, self.width))
+            self._local.row = buffer
+        return buffer
+
+    def encode(self, data):
+        """Encode one property dict into the per-thread (1, width) buffer"""
+        row = self._row_buffer()
+        row.fill(0)
+
+        values = {
+            'total_sqft': float(data.get('total_sqft', 1000)),
+            'bath': float(data.get('bath', 2)),
+            'balcony': float(data.get('balcony', 1)),
+            'bhk': self.parse_bhk(data.get('size', '2 BHK'))
+        }
+        for name, i in self.numeric_index.items():
+            row[0, i] = values[name]
+
+        location_col = self.location_index.get(str(data.get('location', '')).strip().lower())
+        if location_col is not None:
+            row[0, location_col] = 1
+        area_type_col = self.area_type_index.get(str(data.get('area_type', '')).strip().lower())
+        if area_type_col is not None:
+            row[0, area_type_col] = 1
+
+        return row
+
+    def encode_frame(self, frame):
+        """Encode a prepared prediction frame into an (n, width) matrix"""
+        n = len(frame)
+        matrix = np.zeros((n, self.width))
+
+        values = {
+            'total_sqft': frame['total_sqft'].to_numpy(dtype=float),
+            'bath': frame['bath'].to_numpy(dtype=float),
+            'balcony': frame['balcony'].to_numpy(dtype=float),
+            'bhk': pd.to_numeric(frame['size'].astype(str).str.extract(r'(\d+)')[0], errors='coerce').fillna(2).to_numpy(dtype=float)
+        }
+        for name, i in self.numeric_index.items():
+            matrix[:, i] = values[name]
+
+        rows = np.arange(n)
+        for column, index in (('location', self.location_index), ('area_type', self.area_type_index)):
+            if not index:
+                continue
+            cols = frame[column].astype(str).str.strip().str.lower().map(index).to_numpy(dtype=float)
+            found = ~np.isnan(cols)
+            matrix[rows[found], cols[found].astype(int)] = 1
+
+        return matrix
+
+def approved_listing_locations(table=None, listing_ids=None):
+    """Distinct locations of approved sale and rental listings (optionally only the given ids of one table)"""
+    tables = [table] if table else ['properties', 'rental_properties']
+    names = set()
+    conn = db_manager.get_connection()
+    cursor = conn.cursor()
+    try:
+        for name in tables:
+            query = f"SELECT DISTINCT location FROM {name} WHERE status = 'approved'"
+            if listing_ids is None:
+                cursor.execute(query)
+                names.update(row[0] for row in cursor.fetchall() if row[0])
+                continue
+            for i in range(0, len(listing_ids), 500):
+                chunk = list(listing_ids[i:i + 500])
+                cursor.execute(f"{query} AND id IN ({','.join('?' * len(chunk))})", chunk)
+                names.update(row[0] for row in cursor.fetchall() if row[0])
+    finally:
+        conn.close()
+    return sorted(names)
+
+def register_approved_locations(table=None, listing_ids=None):
+    """Teach the chat location matcher the locations of approved listings; returns how many were new"""
+    try:
+        return sum(location_matcher.add(name) for name in approved_listing_locations(table, listing_ids))
+    except Exception as e:
+        print(f"❌ Could not load listing locations: {e}")
+        return 0
 
 def load_data():
     """Load model and data"""
-    global model, df, locations
+    global model, feature_encoder, dataset, locations, location_index, location_matcher, trend_store
 
     try:
         # Load model
@@ -155,19 +450,15 @@ def load_data():
             model = joblib.load('model.pkl')
             print("✅ Model loaded successfully")
 
-        # Load data
-        if os.path.exists('housing.csv'):
-            df = pd.read_csv('housing.csv')
-            print("✅ Housing data loaded successfully")
-        elif os.path.exists('Bengaluru_House_Data.csv'):
-            df = pd.read_csv('Bengaluru_House_Data.csv')
-            print("✅ Bengaluru data loaded successfully")
+        # Load data (memory-mapped per column, only opened when first used)
+        csv_path = find_dataset_csv()
+        if csv_path:
+            dataset = LazyDataset(csv_path)
+            print(f"✅ {csv_path} mapped from {dataset.cache_dir}")
 
         # Extract locations
-        if df is not None and 'location' in df.columns:
-            # Filter out NaN values and convert to string before sorting
-            unique_locations = df['location'].dropna().astype(str).unique().tolist()
-            locations = sorted([loc for loc in unique_locations if loc != 'nan'])
+        if dataset is not None and 'location' in dataset:
+            locations = unique_locations(dataset)
         else:
             locations = [
                 "Electronic City Phase II", "Chikka Tirupathi", "Uttarahalli",
@@ -176,17 +467,88 @@ def load_data():
                 "Indiranagar", "Jayanagar", "BTM Layout", "HSR Layout"
             ]
 
+        location_index = LocationIndex(locations)
+        # Listing locations are only recognised once a moderator has approved the listing
+        location_matcher = LocationMatcher(locations)
+        register_approved_locations()
+        trend_store = TrendStore.for_dataset(dataset)
         print(f"✅ Loaded {len(locations)} locations")
 
+        if model is not None:
+            # Bare (unprefixed) location columns are only trusted if they name a known location
+            feature_encoder = FeatureEncoder.from_model(model, locations)
+            if feature_encoder is not None:
+                # Encoded rows are plain arrays laid out in feature_names_in_ order
+                warnings.filterwarnings('ignore', message='X does not have valid feature names')
+                print(f"✅ Feature encoder built for {feature_encoder.width} model columns")
+
     except Exception as e:
         print(f"❌ Error loading data: {e}")
 
 # Load data on startup
 load_data()
 
+# Pricing heuristics shared by single and batch prediction
+PREMIUM_LOCATIONS = ['whitefield', 'koramangala', 'indiranagar', 'jayanagar']
+PREMIUM_LOCATION_FACTOR = 1.4
+# Checked in order, first substring match wins (same as the original if/elif chain)
+SIZE_MULTIPLIERS = [('3', 1.3), ('4', 1.6), ('1', 0.7)]
+MAX_BATCH_SIZE = 10000
+
+# Defaults applied to every prediction input, matching the single-property endpoints
+PREDICTION_DEFAULTS = {
+    'location': '',
+    'area_type': 'Super built-up Area',
+    'size': '2 BHK',
+    'total_sqft': 1000,
+    'bath': 2,
+    'balcony': 1,
+    'availability': 'Ready To Move'
+}
+
+def prediction_cache_key(data):
+    """Normalized feature tuple used as the prediction cache key"""
+    return (
+        str(data.get('location', '')).strip().lower(),
+        str(data.get('area_type', PREDICTION_DEFAULTS['area_type'])).strip().lower(),
+        str(data.get('size', PREDICTION_DEFAULTS['size'])).strip().upper(),
+        round(float(data.get('total_sqft', PREDICTION_DEFAULTS['total_sqft'])), 1),
+        int(data.get('bath', PREDICTION_DEFAULTS['bath'])),
+        int(data.get('balcony', PREDICTION_DEFAULTS['balcony'])),
+        str(data.get('availability', PREDICTION_DEFAULTS['availability'])).strip().lower()
+    )
+
+def price_noise(n=None):
+    """Random "realism" factor in [0.9, 1.1), or exactly 1.0 in deterministic mode"""
+    if app.config['PREDICTION_DETERMINISTIC']:
+        return 1.0 if n is None else np.ones(n)
+    return 0.9 + np.random.random(n) * 0.2
+
 def predict_price(data):
+    """Predict a price in lakhs, served from the prediction cache in deterministic mode"""
+    if not app.config['PREDICTION_DETERMINISTIC']:
+        return compute_price(data)
+
+    try:
+        key = prediction_cache_key(data)
+    except (TypeError, ValueError):
+        return compute_price(data)
+
+    price = prediction_cache.get(key)
+    if price is None:
+        price = compute_price(data)
+        prediction_cache.set(key, price)
+    return price
+
+def compute_price(data):
     """Enhanced price prediction with dashboard data"""
     try:
+        if feature_encoder is not None:
+            try:
+                return max(float(model.predict(feature_encoder.encode(data))[0]), 10)
+            except Exception as e:
+                print(f"Model inference error, using heuristic pricing: {e}")
+
         if model is not None:
             # Create a simple prediction based on available data
             base_price = 50  # Base price in lakhs
@@ -196,32 +558,87 @@ def predict_price(data):
             price = base_price * sqft_factor
 
             # Adjust based on BHK
-            size = data.get('size', '2 BHK')
-            if '3' in str(size):
-                price *= 1.3
-            elif '4' in str(size):
-                price *= 1.6
-            elif '1' in str(size):
-                price *= 0.7
+            size = str(data.get('size', '2 BHK'))
+            for token, multiplier in SIZE_MULTIPLIERS:
+                if token in size:
+                    price *= multiplier
+                    break
 
             # Adjust based on location (premium locations)
             location = data.get('location', '').lower()
-            premium_locations = ['whitefield', 'koramangala', 'indiranagar', 'jayanagar']
-            if any(loc in location for loc in premium_locations):
-                price *= 1.4
+            if any(loc in location for loc in PREMIUM_LOCATIONS):
+                price *= PREMIUM_LOCATION_FACTOR
 
             # Add some randomness for realism
-            price *= (0.9 + np.random.random() * 0.2)
+            price *= price_noise()
 
             return max(price, 10)  # Minimum 10 lakhs
         else:
             # Fallback calculation
+            if app.config['PREDICTION_DETERMINISTIC']:
+                return 100.5  # Midpoint of the 75.5-125.5 fallback range
             return 75.5 + np.random.random() * 50
 
     except Exception as e:
         print(f"Prediction error: {e}")
         return 75.5
 
+def prepare_batch_frame(records):
+    """Normalize a list of property dicts (or a DataFrame) into a typed prediction frame"""
+    frame = records.copy() if isinstance(records, pd.DataFrame) else pd.DataFrame.from_records(list(records))
+
+    for column, default in PREDICTION_DEFAULTS.items():
+        if column not in frame.columns:
+            frame[column] = default
+        if isinstance(default, str):
+            frame[column] = frame[column].fillna(default).astype(str)
+        else:
+            values = pd.to_numeric(frame[column], errors='coerce').replace([np.inf, -np.inf], np.nan)
+            if column == 'total_sqft':
+                values = values.where(values > 0)  # Non-positive areas count as missing
+            frame[column] = values.fillna(default)
+
+    frame['total_sqft'] = frame['total_sqft'].astype(float)
+    frame['bath'] = frame['bath'].astype(int)
+    frame['balcony'] = frame['balcony'].astype(int)
+    return frame[list(PREDICTION_DEFAULTS)]
+
+def predict_prices_batch(frame):
+    """Vectorized price prediction for a prepared frame, one price (lakhs) per row"""
+    n = len(frame)
+    if n == 0:
+        return np.empty(0)
+
+    if feature_encoder is not None:
+        try:
+            return np.maximum(np.asarray(model.predict(feature_encoder.encode_frame(frame)), dtype=float), 10)
+        except Exception as e:
+            print(f"Model inference error, using heuristic pricing: {e}")
+
+    if model is None:
+        # Fallback calculation
+        if app.config['PREDICTION_DETERMINISTIC']:
+            return np.full(n, 100.5)
+        return 75.5 + np.random.random(n) * 50
+
+    # Base price in lakhs scaled by total_sqft
+    prices = 50 * (frame['total_sqft'].to_numpy(dtype=float) / 1000)
+
+    # BHK adjustment, first matching token wins
+    sizes = frame['size'].astype(str)
+    conditions = [sizes.str.contains(token, regex=False).to_numpy() for token, _ in SIZE_MULTIPLIERS]
+    prices *= np.select(conditions, [multiplier for _, multiplier in SIZE_MULTIPLIERS], default=1.0)
+
+    # Premium location adjustment
+    premium_pattern = '|'.join(re.escape(loc) for loc in PREMIUM_LOCATIONS)
+    is_premium = frame['location'].astype(str).str.lower().str.contains(premium_pattern, regex=True).to_numpy()
+    prices *= np.where(is_premium, PREMIUM_LOCATION_FACTOR, 1.0)
+
+    # Add some randomness for realism
+    prices *= price_noise(n)
+
+    return np.maximum(prices, 10)  # Minimum 10 lakhs
+
 def get_dashboard_data(prediction_data=None):
     """Generate dashboard data based on prediction"""
     if prediction_data:
@@ -272,6 +689,706 @@ def get_dashboard_data(prediction_data=None):
             }
         }
 
+# ===================== PREDICTION HISTORY =====================
+
+HISTORY_PAGE_SIZE = 20
+
+def init_prediction_history():
+    """Create the server-side prediction history table if needed"""
+    try:
+        conn = db_manager.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS predictions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                owner_key VARCHAR(100) NOT NULL,  -- user:<id> or session:<history_id>
+                location VARCHAR(100),
+                size VARCHAR(20),
+                total_sqft REAL,
+                predicted_price REAL NOT NULL,
+                input_data TEXT,      -- JSON string of cleaned inputs
+                dashboard_data TEXT,  -- JSON string of dashboard data
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_predictions_owner ON predictions (owner_key, id)')
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"❌ Error creating prediction history table: {e}")
+
+init_prediction_history()
+
+def get_history_owner_key():
+    """Identify whose history to use: the logged-in user, else the anonymous browser session"""
+    current_user = get_current_user()
+    if current_user:
+        return f"user:{current_user['id']}"
+
+    # Dedicated random id: session['session_id'] is a guessable timestamp set by home()
+    history_id = session.get('history_id')
+    if not history_id:
+        history_id = secrets.token_hex(16)
+        session['history_id'] = history_id
+    return f"session:{history_id}"
+
+def purge_idle_anonymous_predictions(idle_hours):
+    """Delete prediction histories of anonymous sessions idle for idle_hours; returns rows removed"""
+    cutoff = (datetime.now() - timedelta(hours=idle_hours)).isoformat()
+    conn = db_manager.get_connection()
+    cursor = conn.cursor()
+    # Range on owner_key (rather than LIKE) so the owner index is used; ';' sorts right after ':'
+    cursor.execute('''
+        DELETE FROM predictions WHERE owner_key IN (
+            SELECT owner_key FROM predictions
+            WHERE owner_key >= 'session:' AND owner_key < 'session;'
+            GROUP BY owner_key
+            HAVING MAX(created_at) < ?
+        )
+    ''', (cutoff,))
+    removed = cursor.rowcount
+    conn.commit()
+    conn.close()
+    return removed
+
+def _prediction_row_to_record(row):
+    """Rebuild the prediction record shape the history/dashboard templates expect"""
+    prediction_id, created_at, input_data, predicted_price, dashboard_data = row
+    return {
+        'id': prediction_id,
+        'timestamp': created_at,
+        'input_data': json.loads(input_data) if input_data else {},
+        'predicted_price': predicted_price,
+        'formatted_price': f"₹{predicted_price:,.2f} Lakhs",
+        'dashboard_data': json.loads(dashboard_data) if dashboard_data else None
+    }
+
+def save_prediction(owner_key, clean_data, price, dashboard_data):
+    """Persist one prediction and return its record"""
+    timestamp = datetime.now().isoformat()
+    conn = db_manager.get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO predictions (owner_key, location, size, total_sqft, predicted_price,
+                                 input_data, dashboard_data, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (owner_key, clean_data.get('location'), clean_data.get('size'), clean_data.get('total_sqft'),
+          round(price, 2), json.dumps(clean_data), json.dumps(dashboard_data), timestamp))
+    prediction_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+
+    return _prediction_row_to_record((prediction_id, timestamp, json.dumps(clean_data),
+                                      round(price, 2), json.dumps(dashboard_data)))
+
+def get_prediction_history(owner_key, limit=HISTORY_PAGE_SIZE, offset=0):
+    """Latest predictions for an owner, newest first"""
+    conn = db_manager.get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id, created_at, input_data, predicted_price, dashboard_data
+        FROM predictions WHERE owner_key = ?
+        ORDER BY id DESC LIMIT ? OFFSET ?
+    ''', (owner_key, limit, offset))
+    records = [_prediction_row_to_record(row) for row in cursor.fetchall()]
+    conn.close()
+    return records
+
+def get_prediction_summary(owner_key=None):
+    """Prediction count and average price, for one owner or the whole platform"""
+    conn = db_manager.get_connection()
+    cursor = conn.cursor()
+    if owner_key:
+        cursor.execute('SELECT COUNT(*), AVG(predicted_price) FROM predictions WHERE owner_key = ?', (owner_key,))
+    else:
+        cursor.execute('SELECT COUNT(*), AVG(predicted_price) FROM predictions')
+    total, avg_price = cursor.fetchone()
+    conn.close()
+    return {'total_predictions': total or 0, 'avg_price': avg_price}
+
+# ===================== PROPERTY QUERIES =====================
+
+BROWSE_PAGE_SIZE = 24
+
+def init_property_indexes():
+    """Composite indexes backing the browse filters"""
+    try:
+        conn = db_manager.get_connection()
+        cursor = conn.cursor()
+        # Newest-first pages walk this index instead of sorting every matching row
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_properties_status_id ON properties (status, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_properties_status_size ON properties (status, size)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_properties_status_price ON properties (status, COALESCE(expected_price, ai_predicted_price))')
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"❌ Error creating property indexes: {e}")
+
+init_property_indexes()
+
+def _property_row_to_dict(cursor, row):
+    """Convert a properties row to the dict shape used by the templates"""
+    prop = {column[0]: value for column, value in zip(cursor.description, row)}
+    for field in ('amenities', 'images'):
+        try:
+            prop[field] = json.loads(prop[field]) if prop.get(field) else []
+        except (TypeError, ValueError):
+            prop[field] = []
+    return prop
+
+def query_properties(status='approved', location=None, size=None, max_price=None,
+                     page=1, per_page=BROWSE_PAGE_SIZE):
+    """Filtered, paginated property listing executed entirely in SQLite"""
+    conditions = ['p.status = ?']
+    params = [status]
+
+    if location:
+        # Case-insensitive substring match, so "Whitefield" also finds "Whitefield Main Road"
+        escaped = location.strip().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        conditions.append("p.location LIKE '%' || ? || '%' ESCAPE '\\'")
+        params.append(escaped)
+
+    if size:
+        conditions.append('p.size = ?')
+        params.append(size)
+
+    if max_price is not None:
+        conditions.append('COALESCE(p.expected_price, p.ai_predicted_price) <= ?')
+        params.append(max_price)
+
+    where = ' AND '.join(conditions)
+    conn = db_manager.get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(f'SELECT COUNT(*) FROM properties p WHERE {where}', params)
+    total = cursor.fetchone()[0]
+
+    cursor.execute(f'''
+        SELECT p.*, u.username AS owner_username, u.full_name AS owner_name,
+               u.phone AS owner_contact, u.email AS owner_email
+        FROM properties p
+        LEFT JOIN users u ON u.id = p.user_id
+        WHERE {where}
+        ORDER BY p.id DESC
+        LIMIT ? OFFSET ?
+    ''', params + [per_page, (page - 1) * per_page])
+    properties = [_property_row_to_dict(cursor, row) for row in cursor.fetchall()]
+    conn.close()
+
+    return {
+        'properties': properties,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': max((total + per_page - 1) // per_page, 1)
+    }
+
+# ===================== ANALYTICS ROLLUPS =====================
+
+# Listing price as used by the analytics page (expected price, else AI prediction)
+ANALYTICS_PRICE_SQL = 'COALESCE(NULLIF({row}expected_price, 0), {row}ai_predicted_price)'
+
+# dimension -> (bucket expression, optional row condition)
+ROLLUP_DIMENSIONS = {
+    'all': ("'total'", None),
+    'type': ("COALESCE({row}property_type, 'Unknown')", None),
+    'location': ("TRIM(COALESCE({row}location, 'Unknown'))", None),
+    'status': ("COALESCE({row}status, 'pending')", None),
+    'user': ("CAST({row}user_id AS TEXT)", "{row}user_id IS NOT NULL"),
+    'month': ("substr({row}created_at, 1, 7)", "{row}created_at IS NOT NULL"),
+    'price_range': (
+        "CASE WHEN {price} < 50 THEN '0-50L' WHEN {price} < 100 THEN '50-100L' ELSE '100L+' END",
+        "{price} > 0"
+    )
+}
+
+def _rollup_statements(row, sign):
+    """Upserts applying one properties row (NEW. or OLD. prefix) to every rollup bucket"""
+    price = ANALYTICS_PRICE_SQL.format(row=row)
+    statements = []
+    for dimension, (bucket, condition) in ROLLUP_DIMENSIONS.items():
+        where = f"WHERE {condition.format(row=row, price=price)}" if condition else "WHERE 1"
+        statements.append(f'''
+            INSERT INTO property_rollups (dimension, bucket, count, total_price, priced_count)
+            SELECT '{dimension}', {bucket.format(row=row, price=price)}, {sign},
+                   {sign} * COALESCE(NULLIF({price}, 0), 0), {sign} * (COALESCE({price}, 0) > 0)
+            {where}
+            ON CONFLICT (dimension, bucket) DO UPDATE SET
+                count = count + excluded.count,
+                total_price = total_price + excluded.total_price,
+                priced_count = priced_count + excluded.priced_count;''')
+    return ''.join(statements)
+
+def rebuild_property_rollups(cursor):
+    """Recompute every rollup bucket from the properties table"""
+    cursor.execute('DELETE FROM property_rollups')
+    price = ANALYTICS_PRICE_SQL.format(row='p.')
+    for dimension, (bucket, condition) in ROLLUP_DIMENSIONS.items():
+        where = f"WHERE {condition.format(row='p.', price=price)}" if condition else ''
+        cursor.execute(f'''
+            INSERT INTO property_rollups (dimension, bucket, count, total_price, priced_count)
+            SELECT '{dimension}', {bucket.format(row='p.', price=price)}, COUNT(*),
+                   TOTAL(COALESCE(NULLIF({price}, 0), 0)), SUM(COALESCE({price}, 0) > 0)
+            FROM properties p {where}
+            GROUP BY 2
+        ''')
+
+def init_property_rollups():
+    """Create the rollup table, the triggers that maintain it, and backfill on first run"""
+    try:
+        conn = db_manager.get_connection()
+        cursor = conn.cursor()
+        # One worker at a time checks and (re)creates the table and triggers
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'property_rollups'")
+        needs_backfill = cursor.fetchone() is None
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS property_rollups (
+                dimension VARCHAR(20) NOT NULL,  -- all, type, location, status, user, month, price_range
+                bucket VARCHAR(100) NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                total_price REAL NOT NULL DEFAULT 0,
+                priced_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dimension, bucket)
+            )
+        ''')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_properties_analytics_price ON properties ({ANALYTICS_PRICE_SQL.format(row="")})')
+
+        triggers = {
+            'trg_properties_rollup_insert': ('AFTER INSERT', _rollup_statements('NEW.', 1)),
+            'trg_properties_rollup_delete': ('AFTER DELETE', _rollup_statements('OLD.', -1)),
+            'trg_properties_rollup_update': ('AFTER UPDATE', _rollup_statements('OLD.', -1) + _rollup_statements('NEW.', 1))
+        }
+        for name, (event, body) in triggers.items():
+            sql = f'CREATE TRIGGER {name} {event} ON properties BEGIN {body} END'
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,))
+            existing = cursor.fetchone()
+            if existing is None or existing[0] != sql:
+                # Missing, or written for an older set of dimensions: replace it and backfill
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+                cursor.execute(sql)
+                needs_backfill = True
+
+        if needs_backfill:
+            rebuild_property_rollups(cursor)
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"❌ Error creating analytics rollups: {e}")
+
+init_property_rollups()
+
+def get_property_rollups():
+    """Rollup buckets as {dimension: {bucket: (count, total_price, priced_count)}}, per-user buckets excluded"""
+    conn = db_manager.get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT dimension, bucket, count, total_price, priced_count FROM property_rollups
+        WHERE count > 0 AND dimension != 'user'
+    ''')
+    rollups = defaultdict(dict)
+    for dimension, bucket, count, total_price, priced_count in cursor.fetchall():
+        rollups[dimension][bucket] = (count, total_price, priced_count)
+    conn.close()
+    return rollups
+
+# ===================== CHAT HISTORY =====================
+
+CHAT_HISTORY_LIMIT = 20  # Messages kept per conversation
+
+def init_chat_history():
+    """Create the server-side chat history table if needed"""
+    try:
+        conn = db_manager.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation_id VARCHAR(64) NOT NULL,
+                role VARCHAR(10) NOT NULL,  -- user, bot
+                message TEXT NOT NULL,
+                created_at TIMESTAMP NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_messages_conversation ON chat_messages (conversation_id, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_messages_created ON chat_messages (created_at)')
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"❌ Error creating chat history table: {e}")
+
+init_chat_history()
+
+def get_chat_id():
+    """Conversation id for this browser session; only the id is kept in the cookie"""
+    chat_id = session.get('chat_id')
+    if not chat_id:
+        chat_id = secrets.token_hex(16)
+        session['chat_id'] = chat_id
+    # Drop histories stored by older versions in the cookie
+    session.pop('chat_history', None)
+    return chat_id
+
+def load_chat_history(chat_id, limit=CHAT_HISTORY_LIMIT):
+    """Latest messages of a conversation, oldest first, as [{'user'|'bot': text, 'timestamp': ...}]"""
+    conn = db_manager.get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT role, message, created_at FROM chat_messages
+        WHERE conversation_id = ?
+        ORDER BY id DESC LIMIT ?
+    ''', (chat_id, limit))
+    rows = cursor.fetchall()
+    conn.close()
+    return [{role: message, 'timestamp': created_at} for role, message, created_at in reversed(rows)]
+
+def append_chat_messages(chat_id, entries, limit=CHAT_HISTORY_LIMIT):
+    """Store (role, message) entries and trim the conversation to its last `limit` messages"""
+    timestamp = datetime.now().isoformat()
+    conn = db_manager.get_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        'INSERT INTO chat_messages (conversation_id, role, message, created_at) VALUES (?, ?, ?, ?)',
+        [(chat_id, role, message, timestamp) for role, message in entries]
+    )
+    cursor.execute('''
+        DELETE FROM chat_messages
+        WHERE conversation_id = ? AND id <= (
+            SELECT id FROM chat_messages WHERE conversation_id = ?
+            ORDER BY id DESC LIMIT 1 OFFSET ?
+        )
+    ''', (chat_id, chat_id, limit))
+    conn.commit()
+    conn.close()
+
+def purge_idle_chat_history(idle_hours):
+    """Delete conversations with no messages in the last idle_hours; returns rows removed"""
+    cutoff = (datetime.now() - timedelta(hours=idle_hours)).isoformat()
+    conn = db_manager.get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        DELETE FROM chat_messages WHERE conversation_id IN (
+            SELECT conversation_id FROM chat_messages
+            GROUP BY conversation_id
+            HAVING MAX(created_at) < ?
+        )
+    ''', (cutoff,))
+    removed = cursor.rowcount
+    conn.commit()
+    conn.close()
+    return removed
+
+# ===================== SESSION MAINTENANCE =====================
+
+SESSION_SWEEP_BATCH_SIZE = 1000
+
+def init_session_indexes():
+    """Indexes for session validation lookups and expiry sweeps"""
+    try:
+        conn = db_manager.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_sessions_lookup ON user_sessions (session_token, is_active, expires_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_sessions_expires ON user_sessions (expires_at)')
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"❌ Error creating session indexes: {e}")
+
+init_session_indexes()
+
+def purge_expired_sessions(batch_size=SESSION_SWEEP_BATCH_SIZE):
+    """Delete expired and logged-out sessions in small batches; returns rows removed"""
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    removed = 0
+    conn = db_manager.get_connection()
+    cursor = conn.cursor()
+    try:
+        for condition, params in (('expires_at < ?', (now,)), ('is_active = 0', ())):
+            while True:
+                cursor.execute(f'SELECT id, session_token FROM user_sessions WHERE {condition} LIMIT ?',
+                               params + (batch_size,))
+                rows = cursor.fetchall()
+                if rows:
+                    # Short transactions keep the write lock brief for concurrent workers
+                    cursor.executemany('DELETE FROM user_sessions WHERE id = ?', [(row[0],) for row in rows])
+                    conn.commit()
+                    for _, session_token in rows:
+                        session_cache.delete(session_token)
+                removed += len(rows)
+                if len(rows) < batch_size:
+                    break
+    finally:
+        conn.close()
+    return removed
+
+def start_session_sweeper(interval_seconds):
+    """Run purge_expired_sessions every interval_seconds in a daemon thread"""
+    def sweep():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                removed = purge_expired_sessions()
+                if removed:
+                    print(f"✅ Session sweeper removed {removed} expired sessions")
+            except Exception as e:
+                print(f"❌ Session sweeper error: {e}")
+            try:
+                removed = purge_idle_chat_history(app.config['CHAT_IDLE_HOURS'])
+                if removed:
+                    print(f"✅ Session sweeper removed {removed} idle chat messages")
+            except Exception as e:
+                print(f"❌ Chat history sweeper error: {e}")
+            try:
+                removed = purge_idle_anonymous_predictions(app.config['ANONYMOUS_HISTORY_IDLE_HOURS'])
+                if removed:
+                    print(f"✅ Session sweeper removed {removed} anonymous predictions")
+            except Exception as e:
+                print(f"❌ Prediction history sweeper error: {e}")
+            # Pick up listings approved through other workers
+            added = register_approved_locations()
+            if added:
+                print(f"✅ Session sweeper registered {added} new listing locations")
+
+    thread = threading.Thread(target=sweep, name='session-sweeper', daemon=True)
+    thread.start()
+    return thread
+
+if app.config['SESSION_SWEEP_INTERVAL'] > 0:
+    start_session_sweeper(app.config['SESSION_SWEEP_INTERVAL'])
+
+@app.cli.command('sweep-sessions')
+def sweep_sessions_command():
+    """Delete expired sessions and idle chat/prediction histories (flask --app app sweep-sessions)"""
+    print(f"✅ Removed {purge_expired_sessions()} expired/inactive sessions")
+    print(f"✅ Removed {purge_idle_chat_history(app.config['CHAT_IDLE_HOURS'])} idle chat messages")
+    print(f"✅ Removed {purge_idle_anonymous_predictions(app.config['ANONYMOUS_HISTORY_IDLE_HOURS'])} anonymous predictions")
+
+# ===================== AMENITIES CACHE =====================
+
+def cached_location_amenities(location):
+    """get_location_amenities behind a location-keyed TTL/LRU cache (treat results as read-only)"""
+    key = location.strip().lower()
+    amenities_data = amenities_cache.get(key)
+    if amenities_data is None:
+        amenities_data = get_location_amenities(location)
+        amenities_cache.set(key, amenities_data)
+    return amenities_data
+
+def warm_amenities_cache(location_names=None):
+    """Preload amenities for every known location; returns how many were computed"""
+    computed = 0
+    for location in (location_names if location_names is not None else list(locations)):
+        if location.strip().lower() not in amenities_cache:
+            try:
+                cached_location_amenities(location)
+                computed += 1
+            except Exception as e:
+                print(f"❌ Amenities warmup failed for {location}: {e}")
+    return computed
+
+if app.config['AMENITIES_WARMUP']:
+    threading.Thread(target=warm_amenities_cache, name='amenities-warmup', daemon=True).start()
+
+@app.cli.command('warm-amenities')
+def warm_amenities_command():
+    """Compute amenities for all locations and report timing (flask --app app warm-amenities)"""
+    started = time.time()
+    computed = warm_amenities_cache()
+    print(f"✅ Warmed amenities for {computed} locations in {time.time() - started:.2f}s")
+
+# ===================== IMAGE UPLOADS =====================
+
+UPLOADS_DIR = os.path.join(app.static_folder, 'uploads')
+image_pipeline = ImagePipeline(os.path.join(UPLOADS_DIR, 'images'), '/static/uploads/images',
+                               workers=app.config['IMAGE_WORKERS'])
+
+def queue_uploaded_images(uploaded_files, limit):
+    """Stage up to `limit` uploads for background processing; returns (image_urls, uploads, rejected)"""
+    image_urls = []
+    uploads = []
+    rejected = []
+    for file in uploaded_files:
+        if not file or not file.filename:
+            continue
+        if len(uploads) >= limit:
+            rejected.append({'filename': file.filename, 'error': f'Image limit reached (max {limit})'})
+            continue
+        try:
+            upload = image_pipeline.submit(file)
+        except Exception as e:
+            print(f"Error saving image: {e}")
+            # Continue without this image
+            rejected.append({'filename': file.filename, 'error': str(e)})
+            continue
+        image_urls.append(upload['urls']['full'])
+        uploads.append(upload)
+    return image_urls, uploads, rejected
+
+recovered_uploads = image_pipeline.recover()
+if recovered_uploads:
+    print(f"✅ Requeued {recovered_uploads} staged image uploads")
+
+IMAGE_TABLES = ('properties', 'rental_properties')
+
+def image_reference_counts():
+    """Listings referencing each image blob, from the images JSON columns of both listing tables"""
+    conn = db_manager.get_connection()
+    cursor = conn.cursor()
+    cursor.execute(' UNION ALL '.join(
+        f"SELECT value FROM {table}, json_each({table}.images) WHERE json_valid({table}.images)"
+        for table in IMAGE_TABLES
+    ))
+    counts = Counter()
+    for (url,) in cursor.fetchall():
+        digest = digest_from_url(url)
+        if digest:
+            counts[digest] += 1
+    conn.close()
+    return counts
+
+def collect_orphan_images(grace_hours=None, dry_run=False):
+    """Delete blobs no listing references (older than the grace period, so in-flight uploads survive)"""
+    grace_hours = app.config['IMAGE_GC_GRACE_HOURS'] if grace_hours is None else grace_hours
+    cutoff = time.time() - grace_hours * 3600
+    references = image_reference_counts()
+    blobs = image_pipeline.stored_digests()
+
+    report = {'blobs': len(blobs), 'referenced': 0, 'orphaned': 0, 'bytes_freed': 0, 'dry_run': dry_run}
+    for digest, (size, mtime) in blobs.items():
+        if references.get(digest):
+            report['referenced'] += 1
+        elif mtime < cutoff:
+            report['orphaned'] += 1
+            report['bytes_freed'] += size if dry_run else image_pipeline.remove(digest)
+    if not dry_run:
+        report['staging_removed'] = image_pipeline.purge_staging(grace_hours * 3600)
+    return report
+
+def migrate_legacy_uploads():
+    """Move per-upload files (static/uploads/property_*, static/uploads/rentals/*) into the blob store"""
+    legacy_prefix = '/static/uploads/'
+    digests = {}  # legacy url -> digest (None when missing or unreadable)
+    report = {'rows_updated': 0, 'files_migrated': 0, 'files_missing': 0}
+
+    conn = db_manager.get_connection()
+    cursor = conn.cursor()
+    for table in IMAGE_TABLES:
+        cursor.execute(f"SELECT id, images FROM {table} WHERE images LIKE '%/static/uploads/%'")
+        for row_id, images_json in cursor.fetchall():
+            try:
+                images = json.loads(images_json)
+            except (TypeError, ValueError):
+                continue
+            updated = []
+            for url in images:
+                if (isinstance(url, str) and url.startswith(legacy_prefix) and '..' not in url
+                        and not digest_from_url(url)):
+                    if url not in digests:
+                        path = os.path.join(UPLOADS_DIR, *url[len(legacy_prefix):].split('/'))
+                        digests[url] = image_pipeline.ingest_path(path) if os.path.isfile(path) else None
+                        report['files_migrated' if digests[url] else 'files_missing'] += 1
+                    if digests[url]:
+                        url = image_pipeline.urls(digests[url])['full']
+                updated.append(url)
+            if updated != images:
+                cursor.execute(f"UPDATE {table} SET images = ? WHERE id = ?", (json.dumps(updated), row_id))
+                report['rows_updated'] += 1
+    conn.commit()
+    conn.close()
+
+    # Every reference now points at the blob, so the per-upload copies can go
+    for url, digest in digests.items():
+        if digest:
+            try:
+                os.remove(os.path.join(UPLOADS_DIR, *url[len(legacy_prefix):].split('/')))
+            except FileNotFoundError:
+                pass
+    report['unique_images'] = len(set(filter(None, digests.values())))
+    return report
+
+@app.cli.command('gc-images')
+def gc_images_command():
+    """Delete image blobs no listing references (flask --app app gc-images)"""
+    report = collect_orphan_images()
+    print(f"✅ Removed {report['orphaned']} of {report['blobs']} image blobs, freed {report['bytes_freed'] / 1024 / 1024:.1f} MB")
+
+@app.cli.command('migrate-uploads')
+def migrate_uploads_command():
+    """Deduplicate legacy per-upload image files into the blob store (flask --app app migrate-uploads)"""
+    report = migrate_legacy_uploads()
+    print(f"✅ Migrated {report['files_migrated']} files into {report['unique_images']} blobs, "
+          f"updated {report['rows_updated']} listings ({report['files_missing']} missing files)")
+
+# ===================== STATIC ASSETS =====================
+
+IMMUTABLE_MAX_AGE = 31536000  # One year
+static_fingerprints = TTLCache(max_size=8192, ttl_seconds=86400)
+
+def static_fingerprint(path):
+    """Content fingerprint of a static file, recomputed only when its size or mtime changes"""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    value = static_fingerprints.get(key)
+    if value is None:
+        value = fingerprint(path)
+        static_fingerprints.set(key, value)
+    return value
+
+@app.url_defaults
+def add_static_fingerprint(endpoint, values):
+    """url_for('static', ...) URLs carry ?v=<fingerprint> so they can be cached as immutable"""
+    if endpoint != 'static' or 'v' in values:
+        return
+    filename = values.get('filename', '')
+    if digest_from_url('/' + filename):
+        return  # Content-addressed already
+    path = safe_join(app.static_folder, filename)
+    if path and os.path.isfile(path):
+        values['v'] = static_fingerprint(path)
+
+def serve_static(filename):
+    """Static files with ETags, immutable caching for versioned/content-addressed files and .br/.gz siblings"""
+    path = safe_join(app.static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    digest = digest_from_url('/' + filename)
+    if digest:
+        # The URL names the content, so it can never change
+        etag = filename.rsplit('/', 1)[-1]
+        max_age, immutable = IMMUTABLE_MAX_AGE, True
+    else:
+        etag = static_fingerprint(path)
+        if request.args.get('v') == etag:
+            max_age, immutable = IMMUTABLE_MAX_AGE, True
+        elif filename.startswith('uploads/'):
+            max_age, immutable = app.config['UPLOADS_MAX_AGE'], False
+        else:
+            max_age, immutable = app.config['STATIC_MAX_AGE'], False
+
+    served_path, encoding = precompressed_variant(path, request.headers.get('Accept-Encoding'))
+    if encoding:
+        etag = f"{etag}-{encoding}"
+
+    # The type comes from the original name, not the .br/.gz sibling
+    response = send_file(served_path, mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                         download_name=os.path.basename(filename), etag=etag, max_age=max_age, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = immutable or None
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+app.view_functions['static'] = serve_static
+
+@app.cli.command('precompress-static')
+def precompress_static_command():
+    """Write .gz/.br siblings for compressible static assets (flask --app app precompress-static)"""
+    written = precompress_tree(app.static_folder)
+    print(f"✅ Wrote {len(written)} precompressed static files")
+
 # ===================== ROUTES =====================
 
 @app.route('/')
@@ -387,6 +1504,7 @@ def logout():
     """User logout"""
     session_token = session.get('user_session_token')
     if session_token:
+        invalidate_user_sessions(session_token=session_token)
         db_manager.logout_user(session_token)
 
     session.clear()
@@ -444,21 +1562,8 @@ def predict_page():
             # Generate dashboard data based on prediction
             dashboard_data = get_dashboard_data(clean_data)
 
-            # Save to session
-            if 'predictions' not in session:
-                session['predictions'] = []
-
-            prediction_record = {
-                'id': len(session['predictions']) + 1,
-                'timestamp': datetime.now().isoformat(),
-                'input_data': clean_data,
-                'predicted_price': round(price, 2),
-                'formatted_price': f"₹{price:,.2f} Lakhs",
-                'dashboard_data': dashboard_data
-            }
-
-            session['predictions'].append(prediction_record)
-            session.modified = True
+            # Save to server-side history (only the session id lives in the cookie)
+            prediction_record = save_prediction(get_history_owner_key(), clean_data, price, dashboard_data)
 
             if request.is_json:
                 return jsonify({
@@ -523,6 +1628,60 @@ def api_predict():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/predict/batch', methods=['POST'])
+@rate_limit(max_requests=10, window_seconds=60)
+def api_predict_batch():
+    """Batch prediction API - accepts a JSON array or a CSV upload of properties"""
+    try:
+        if 'file' in request.files:
+            upload = request.files['file']
+            if not upload or not upload.filename:
+                return jsonify({'success': False, 'error': 'CSV file is required'}), 400
+            records = pd.read_csv(upload, nrows=MAX_BATCH_SIZE + 1)
+        else:
+            data = request.get_json(silent=True)
+            records = data.get('properties') if isinstance(data, dict) else data
+            if not isinstance(records, list):
+                return jsonify({'success': False, 'error': 'Expected a JSON array of properties'}), 400
+            # Reject rather than drop, so 'index' keeps matching the client's positions
+            invalid_indices = [i for i, record in enumerate(records) if not isinstance(record, dict)]
+            if invalid_indices:
+                return jsonify({'success': False, 'error': 'Every property must be a JSON object',
+                                'invalid_indices': invalid_indices[:100]}), 400
+
+        if len(records) == 0:
+            return jsonify({'success': False, 'error': 'No properties to predict'}), 400
+        if len(records) > MAX_BATCH_SIZE:
+            return jsonify({'success': False, 'error': f'Batch size limited to {MAX_BATCH_SIZE} properties'}), 400
+
+        frame = prepare_batch_frame(records)
+        prices = np.round(predict_prices_batch(frame), 2)
+
+        predictions = [
+            {
+                'index': i,
+                'location': location,
+                'size': size,
+                'total_sqft': sqft,
+                'prediction': price,
+                'formatted_price': f"₹{price:,.2f} Lakhs"
+            }
+            for i, (location, size, sqft, price) in enumerate(zip(
+                frame['location'], frame['size'], frame['total_sqft'].tolist(), prices.tolist()
+            ))
+        ]
+
+        return jsonify({
+            'success': True,
+            'count': len(predictions),
+            'predictions': predictions,
+            'total_value': round(float(prices.sum()), 2),
+            'average_price': round(float(prices.mean()), 2)
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/trends')
 def trends():
     """Market trends page"""
@@ -549,27 +1708,18 @@ def trends():
 def api_trends(location):
     """Get enhanced trend data for a location with amenities analysis"""
     try:
-        # Generate sample trend data
-        years = list(range(2018, 2025))
-        base_price = 75 + (hash(location) % 50)  # Base price varies by location
-
-        # Simulate price growth with some randomness
-        prices = []
-        current_price = base_price
-        growth_rates = []
-
-        for year in years:
-            growth_rate = 0.08 + (hash(f"{location}{year}") % 10) / 100  # 8-18% growth
-            current_price *= (1 + growth_rate)
-            prices.append(round(current_price, 2))
-            growth_rates.append(round(growth_rate * 100, 1))
+        # Precomputed series, identical across workers
+        trend = trend_store.get(location)
+        years = trend['years']
+        prices = trend['prices']
+        growth_rates = trend['growth_rates']
 
         # Calculate additional metrics
         total_growth = ((prices[-1] - prices[0]) / prices[0]) * 100
         avg_growth = sum(growth_rates) / len(growth_rates)
 
         # Get amenities data for location analysis
-        amenities_data = get_location_amenities(location)
+        amenities_data = cached_location_amenities(location)
 
         # Generate investment insights based on amenities
         investment_rating = "Good"
@@ -602,7 +1752,10 @@ def api_trends(location):
                 'avg_annual_growth': round(avg_growth, 1),
                 'current_price': prices[-1],
                 'price_change_1yr': round(prices[-1] - prices[-2], 2),
-                'investment_rating': investment_rating
+                'investment_rating': investment_rating,
+                'median_price_per_sqft': trend['median_price_per_sqft'],
+                'sample_size': trend['sample_size'],
+                'source': trend['source']
             },
             'amenities_summary': {
                 'overall_score': amenities_data['overall_score'],
@@ -703,9 +1856,10 @@ def api_chat():
         data = request.get_json()
         message = data.get('message', '').lower()
 
-        # Get user context from session
+        # Get user context; chat history lives server-side, keyed by the session's chat id
         user_properties = session.get('user_properties', [])
-        chat_history = session.get('chat_history', [])
+        chat_id = get_chat_id()
+        chat_history = load_chat_history(chat_id, CHAT_HISTORY_LIMIT - 1)
 
         # Add current message to history
         chat_history.append({'user': message, 'timestamp': datetime.now().isoformat()})
@@ -713,19 +1867,21 @@ def api_chat():
         # Advanced response generation
         response_data = generate_advanced_response(message, user_properties, chat_history)
 
-        # Add response to history
-        chat_history.append({'bot': response_data['response'], 'timestamp': datetime.now().isoformat()})
-        session['chat_history'] = chat_history[-20:]  # Keep last 20 messages
-        session.modified = True
+        # Persist the exchange (trimmed to the last CHAT_HISTORY_LIMIT messages)
+        append_chat_messages(chat_id, [('user', message), ('bot', response_data['response'])])
 
-        return jsonify({
+        result = {
             'success': True,
             'response': response_data['response'],
             'suggestions': response_data.get('suggestions', []),
             'actions': response_data.get('actions', []),
             'data': response_data.get('data', {}),
             'timestamp': datetime.now().isoformat()
-        })
+        }
+        if data.get('multi_intent'):
+            result['intents'] = [{'intent': intent, 'score': score} for intent, score in classify_intents(message)]
+
+        return jsonify(result)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -747,10 +1903,10 @@ def generate_advanced_response(message, user_properties, chat_history):
         if entities.get('location'):
             location = entities['location']
             # Get amenities data for location
-            amenities_data = get_location_amenities(location)
+            amenities_data = cached_location_amenities(location)
 
-            # Generate price estimate
-            base_price = 75 + (hash(location) % 50)
+            # Price estimate from the location's trend series
+            base_price = trend_store.get(location)['prices'][-1]
             price_range = f"₹{base_price-10:.1f}L - ₹{base_price+15:.1f}L"
 
             response_data['response'] = f"""🏠 **{location} Property Insights**
@@ -809,7 +1965,7 @@ Which location interests you?"""
         location = entities.get('location', 'Bangalore')
 
         # Generate trend data
-        growth_rate = 8 + (hash(location) % 5)
+        growth_rate = 8 + (stable_hash(location) % 5)
 
         response_data['response'] = f"""📈 **{location} Market Trends**
 
@@ -923,7 +2079,7 @@ Ready to compare specific properties?"""
     elif intent == 'amenities_inquiry':
         location = entities.get('location')
         if location:
-            amenities_data = get_location_amenities(location)
+            amenities_data = cached_location_amenities(location)
 
             response_data['response'] = f"""🏢 **{location} Amenities & Infrastructure**
 
@@ -1035,32 +2191,46 @@ How can I help you today?"""
 
     return response_data
 
+# Intent keywords in priority order (earlier intents win ties)
+INTENT_KEYWORDS = {
+    'price_inquiry': ['price', 'cost', 'value', 'worth', 'predict'],
+    'market_trends': ['trend', 'market', 'growth', 'appreciation'],
+    'emi_calculation': ['emi', 'loan', 'finance', 'mortgage', 'calculate'],
+    'property_comparison': ['compare', 'comparison', 'vs', 'versus', 'better'],
+    'amenities_inquiry': ['amenities', 'facilities', 'schools', 'hospitals', 'transport'],
+    'investment_advice': ['invest', 'investment', 'buy', 'advice', 'recommend']
+}
+INTENT_PRIORITY = {intent: i for i, intent in enumerate(INTENT_KEYWORDS)}
+KEYWORD_INTENTS = {word: intent for intent, words in INTENT_KEYWORDS.items() for word in words}
+# One pass over the message: whole keywords plus common inflections ("trends", "investing", "priced"),
+# but not unrelated words that merely start with one ("eminent", "costume")
+INTENT_SUFFIXES = ('s', 'es', 'd', 'ed', 'ing', 'ion', 'ions', 'ment', 'ments', 'ation', 'ations')
+INTENT_PATTERN = re.compile(
+    r'\b(' + '|'.join(sorted(map(re.escape, KEYWORD_INTENTS), key=len, reverse=True)) + r')'
+    r'(?:' + '|'.join(INTENT_SUFFIXES) + r')?\b'
+)
+
+def classify_intents(message):
+    """Scored intents for a message, best first: [(intent, keyword_hits), ...]"""
+    scores = defaultdict(int)
+    for match in INTENT_PATTERN.finditer(message.lower()):
+        scores[KEYWORD_INTENTS[match.group(1)]] += 1
+    return sorted(scores.items(), key=lambda item: (-item[1], INTENT_PRIORITY[item[0]]))
+
 def detect_intent(message):
     """Detect user intent from message"""
-    if any(word in message for word in ['price', 'cost', 'value', 'worth', 'predict']):
-        return 'price_inquiry'
-    elif any(word in message for word in ['trend', 'market', 'growth', 'appreciation']):
-        return 'market_trends'
-    elif any(word in message for word in ['emi', 'loan', 'finance', 'mortgage', 'calculate']):
-        return 'emi_calculation'
-    elif any(word in message for word in ['compare', 'comparison', 'vs', 'versus', 'better']):
-        return 'property_comparison'
-    elif any(word in message for word in ['amenities', 'facilities', 'schools', 'hospitals', 'transport']):
-        return 'amenities_inquiry'
-    elif any(word in message for word in ['invest', 'investment', 'buy', 'advice', 'recommend']):
-        return 'investment_advice'
-    else:
-        return 'general'
+    intents = classify_intents(message)
+    return intents[0][0] if intents else 'general'
 
 def extract_entities(message):
     """Extract entities like location, amount, etc. from message"""
     entities = {}
 
-    # Extract location
-    for location in locations:
-        if location.lower() in message:
-            entities['location'] = location
-            break
+    # Extract locations in a single pass, preferring the longest mention
+    mentions = location_matcher.find_all(message)
+    if mentions:
+        entities['location'] = max(mentions, key=lambda m: m[1] - m[0])[2]
+        entities['locations'] = [name for _, _, name in mentions]
 
     # Extract amount (in lakhs)
     import re
@@ -1108,6 +2278,49 @@ def loan_calculator():
         </body></html>
         """, 200
 
+def build_loan_extras(data, principal, annual_rate, months):
+    """Optional amortization schedule, prepayment scenario and rate/tenure grid for the loan APIs"""
+    extras = {}
+    prepayments = {}
+    items = data.get('prepayments') or []
+    if not isinstance(items, list):
+        raise ValueError('prepayments must be a list of {"month", "amount"} entries')
+    for position, item in enumerate(items):
+        try:
+            month = int(item['month'])
+            amount = float(item['amount'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'Prepayment {position} needs a numeric month and amount')
+        if not 1 <= month <= months:
+            raise ValueError(f'Prepayment {position}: month must be between 1 and {months}')
+        if not (np.isfinite(amount) and amount >= 0):
+            raise ValueError(f'Prepayment {position}: amount must be a non-negative number')
+        prepayments[month] = prepayments.get(month, 0) + amount
+    monthly_prepayment = float(data.get('monthly_prepayment', 0) or 0)
+    if not (np.isfinite(monthly_prepayment) and monthly_prepayment >= 0):
+        raise ValueError('Monthly prepayment must be a non-negative number')
+
+    if data.get('schedule') or prepayments or monthly_prepayment:
+        validate_loan_terms(annual_rate, months)
+        schedule = amortization_schedule(principal, annual_rate, months, prepayments, monthly_prepayment)
+        extras['amortization'] = {
+            'summary': schedule_summary(schedule, principal, months),
+            'schedule': schedule_to_dict(schedule)
+        }
+
+    grid = data.get('rate_grid')
+    if grid:
+        rates = [float(r) for r in grid.get('rates', [annual_rate])]
+        tenures = [int(t) for t in grid.get('tenures', [months // 12])]
+        if len(rates) * len(tenures) > MAX_GRID_POINTS:
+            raise ValueError(f'Rate grid limited to {MAX_GRID_POINTS} rate/tenure combinations')
+        for grid_rate in rates:
+            for grid_tenure in tenures:
+                validate_loan_terms(grid_rate, grid_tenure * 12)
+        extras['rate_grid'] = rate_tenure_grid(principal, rates, tenures)
+
+    return extras
+
 @app.route('/api/loan-calculator', methods=['POST'])
 def api_loan_calculator():
     """Loan calculator API"""
@@ -1116,6 +2329,7 @@ def api_loan_calculator():
         principal = float(data['principal'])
         rate = float(data['rate']) / 100 / 12  # Monthly rate
         tenure = int(data['tenure']) * 12  # Months
+        validate_loan_terms(float(data['rate']), tenure)
 
         # EMI calculation
         if rate > 0:
@@ -1132,8 +2346,11 @@ def api_loan_calculator():
             'total_amount': round(total_amount, 2),
             'total_interest': round(total_interest, 2),
             'principal': principal,
-            'formatted_emi': f"₹{emi:,.2f}"
+            'formatted_emi': f"₹{emi:,.2f}",
+            **build_loan_extras(data, principal, float(data['rate']), tenure)
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -1147,6 +2364,7 @@ def api_property_emi():
         down_payment_percent = float(data.get('down_payment_percent', 20))
         rate = float(data.get('rate', 8.5))
         tenure = int(data.get('tenure', 20))
+        validate_loan_terms(rate, tenure * 12)
 
         # Calculate loan amount after down payment
         down_payment = property_price * (down_payment_percent / 100)
@@ -1182,8 +2400,101 @@ def api_property_emi():
             'rate': rate,
             'tenure': tenure,
             'formatted_emi': f"₹{emi:,.0f}",
-            'formatted_upfront': f"₹{(down_payment + registration_cost):,.0f}"
+            'formatted_upfront': f"₹{(down_payment + registration_cost):,.0f}",
+            **build_loan_extras(data, loan_amount, rate, num_payments)
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# EMI should stay within 40% of monthly income (same rule as monthly_income_required)
+AFFORDABLE_EMI_RATIO = 0.4
+
+@app.route('/api/affordability', methods=['POST'])
+@rate_limit(max_requests=20, window_seconds=60)
+def api_affordability():
+    """Score every approved listing against a buyer profile, ranked by EMI-to-income ratio"""
+    try:
+        data = request.get_json()
+        monthly_income = float(data['monthly_income'])
+        rate = float(data.get('rate', 8.5))
+        tenure = int(data.get('tenure', 20))
+        down_payment = float(data.get('down_payment', 0))  # Rupees available up front
+        down_payment_percent = float(data.get('down_payment_percent', 20))
+        page = max(int(data.get('page', 1)), 1)
+        per_page = min(max(int(data.get('per_page', 20)), 1), 100)
+
+        if not (np.isfinite(monthly_income) and monthly_income > 0):
+            return jsonify({'success': False, 'error': 'Monthly income must be positive'}), 400
+        if not (np.isfinite(down_payment) and down_payment >= 0):
+            return jsonify({'success': False, 'error': 'Down payment must be a non-negative amount'}), 400
+        validate_loan_terms(rate, tenure * 12)
+        if not 0 <= down_payment_percent <= 100:
+            return jsonify({'success': False, 'error': 'Down payment percent must be between 0 and 100'}), 400
+
+        conn = db_manager.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, property_type, location, size, total_sqft,
+                   COALESCE(expected_price, ai_predicted_price) AS price
+            FROM properties
+            WHERE status = 'approved' AND COALESCE(expected_price, ai_predicted_price) > 0
+        ''')
+        rows = cursor.fetchall()
+        conn.close()
+
+        if not rows:
+            return jsonify({'success': True, 'properties': [], 'total': 0, 'page': page, 'pages': 1})
+
+        ids, property_types, property_locations, sizes, sqft, prices = zip(*rows)
+        prices = np.asarray(prices, dtype=float) * 100000  # Lakhs to rupees
+
+        # Down payment: what the buyer has, but at least the lender's minimum percentage
+        down = np.maximum(np.minimum(down_payment, prices), prices * down_payment_percent / 100)
+        loan = prices - down
+        emi = monthly_emi(loan, rate, tenure * 12)
+        ratio = emi / monthly_income
+        upfront = down + prices * 0.07  # Registration, stamp duty, etc.
+
+        order = np.argsort(ratio, kind='stable')
+        total = len(order)
+        page_rows = order[(page - 1) * per_page:page * per_page]
+
+        properties = [{
+            'id': ids[i],
+            'property_type': property_types[i],
+            'location': property_locations[i],
+            'size': sizes[i],
+            'total_sqft': sqft[i],
+            'price': round(prices[i] / 100000, 2),
+            'down_payment': round(float(down[i]), 2),
+            'loan_amount': round(float(loan[i]), 2),
+            'emi': round(float(emi[i]), 2),
+            'emi_to_income': round(float(ratio[i]), 4),
+            'upfront_cost': round(float(upfront[i]), 2),
+            'affordable': bool(ratio[i] <= AFFORDABLE_EMI_RATIO),
+            'formatted_emi': f"₹{emi[i]:,.0f}"
+        } for i in page_rows]
+
+        return jsonify({
+            'success': True,
+            'properties': properties,
+            'total': total,
+            'affordable_count': int((ratio <= AFFORDABLE_EMI_RATIO).sum()),
+            'page': page,
+            'per_page': per_page,
+            'pages': max((total + per_page - 1) // per_page, 1),
+            'buyer_profile': {
+                'monthly_income': monthly_income,
+                'down_payment': down_payment,
+                'down_payment_percent': down_payment_percent,
+                'rate': rate,
+                'tenure': tenure
+            }
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -1192,18 +2503,44 @@ def api_locations():
     """Get all locations"""
     return jsonify({'success': True, 'locations': locations})
 
+@app.route('/api/images/<digest>')
+def api_image_status(digest):
+    """Processing status and variant URLs of an uploaded image"""
+    if not DIGEST_PATTERN.match(digest):
+        return jsonify({'success': False, 'error': 'Invalid image id'}), 400
+    return jsonify({
+        'success': True,
+        'digest': digest,
+        'status': image_pipeline.status(digest),
+        'urls': image_pipeline.urls(digest)
+    })
+
 @app.route('/api/location-suggestions')
 def location_suggestions():
-    """Get location suggestions"""
-    query = request.args.get('q', '').lower()
-    suggestions = [loc for loc in locations if query in loc.lower()][:10]
+    """Get ranked location suggestions (prefix, substring, optional typo-tolerant)"""
+    query = request.args.get('q', '')
+    fuzzy = request.args.get('fuzzy', 'false').lower() in ('1', 'true', 'yes')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    suggestions = location_index.search(query, limit=limit, fuzzy=fuzzy)
     return jsonify({'success': True, 'suggestions': suggestions})
 
 @app.route('/history')
 def history():
-    """Prediction history"""
-    predictions = session.get('predictions', [])
-    return render_template('simple_history.html', predictions=predictions)
+    """Prediction history, newest first, paginated"""
+    page = max(request.args.get('page', 1, type=int), 1)
+    owner_key = get_history_owner_key()
+
+    predictions = get_prediction_history(owner_key, HISTORY_PAGE_SIZE, (page - 1) * HISTORY_PAGE_SIZE)
+    total = get_prediction_summary(owner_key)['total_predictions']
+
+    return render_template('simple_history.html',
+                         predictions=predictions,
+                         pagination={
+                             'page': page,
+                             'per_page': HISTORY_PAGE_SIZE,
+                             'total': total,
+                             'pages': max((total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE, 1)
+                         })
 
 @app.route('/list-property', methods=['GET', 'POST'])
 @rate_limit(max_requests=10, window_seconds=300)  # Stricter limit for property listing
@@ -1233,24 +2570,12 @@ def list_property():
             if not re.match(r'^[6-9]\d{9}$', contact):
                 raise ValueError("Please enter a valid 10-digit mobile number")
 
-            # Handle image uploads
-            image_urls = []
+            # Handle image uploads (resized in the background; URLs resolve once processed)
+            image_urls, image_uploads, rejected_images = [], [], []
             if 'property_images' in files:
-                uploaded_files = files.getlist('property_images')
-                for i, file in enumerate(uploaded_files[:5]):  # Limit to 5 images
-                    if file and file.filename:
-                        # Generate unique filename
-                        file_extension = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else 'jpg'
-                        unique_filename = f"property_{len(session.get('user_properties', [])) + 1}_{i+1}_{int(datetime.now().timestamp())}.{file_extension}"
-
-                        # Save file to uploads directory
-                        try:
-                            file_path = os.path.join('static', 'uploads', unique_filename)
-                            file.save(file_path)
-                            image_urls.append(f"/static/uploads/{unique_filename}")
-                        except Exception as e:
-                            print(f"Error saving image: {e}")
-                            # Continue without this image
+                image_urls, image_uploads, rejected_images = queue_uploaded_images(
+                    files.getlist('property_images'), app.config['MAX_PROPERTY_IMAGES']
+                )
 
             # Clean and validate property data
             property_data = {
@@ -1296,7 +2621,9 @@ def list_property():
                     'message': 'Property listed successfully!',
                     'property_id': property_data['id'],
                     'ai_predicted_price': f"₹{predicted_price:,.2f} Lakhs",
-                    'property_data': property_data
+                    'property_data': property_data,
+                    'image_uploads': image_uploads,
+                    'rejected_images': rejected_images
                 })
             else:
                 return render_template('list_property.html',
@@ -1323,39 +2650,39 @@ def my_properties():
 
 @app.route('/browse-properties')
 def browse_properties():
-    """Browse all approved properties from database"""
-    # Get approved properties from database
-    result = db_manager.get_all_properties(status='approved')
-    all_properties = result.get('properties', []) if result['success'] else []
-
+    """Browse approved properties, filtered and paginated in the database"""
     # Filter by query parameters
     location_filter = request.args.get('location')
     size_filter = request.args.get('size')
     max_price = request.args.get('max_price')
+    page = max(request.args.get('page', 1, type=int), 1)
 
-    filtered_properties = all_properties
-
-    if location_filter:
-        filtered_properties = [p for p in filtered_properties if location_filter.lower() in p['location'].lower()]
-
-    if size_filter:
-        filtered_properties = [p for p in filtered_properties if p['size'] == size_filter]
-
+    max_price_val = None
     if max_price:
         try:
             max_price_val = float(max_price)
-            filtered_properties = [p for p in filtered_properties
-                                 if (p['expected_price'] or p['ai_predicted_price']) <= max_price_val]
         except ValueError:
             pass
 
+    try:
+        result = query_properties('approved', location_filter, size_filter, max_price_val, page)
+    except Exception as e:
+        print(f"Browse properties error: {e}")
+        result = {'properties': [], 'total': 0, 'page': page, 'per_page': BROWSE_PAGE_SIZE, 'pages': 1}
+
     return render_template('browse_properties.html',
-                         properties=filtered_properties,
+                         properties=result['properties'],
                          locations=locations,
                          filters={
                              'location': location_filter,
                              'size': size_filter,
                              'max_price': max_price
+                         },
+                         pagination={
+                             'page': result['page'],
+                             'per_page': result['per_page'],
+                             'total': result['total'],
+                             'pages': result['pages']
                          })
 
 @app.route('/property/<property_id>')
@@ -1595,20 +2922,10 @@ def submit_rental_property():
             'images': []
         }
 
-        # Handle image uploads
-        uploaded_files = request.files.getlist('images')
-        for file in uploaded_files:
-            if file and file.filename:
-                # Save file (simplified - in production, use proper file handling)
-                filename = secure_filename(file.filename)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-                unique_filename = timestamp + filename
-                file_path = os.path.join('static/uploads/rentals', unique_filename)
-
-                # Create directory if it doesn't exist
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                file.save(file_path)
-                property_data['images'].append(f'/static/uploads/rentals/{unique_filename}')
+        # Handle image uploads (resized in the background; URLs resolve once processed)
+        property_data['images'], image_uploads, rejected_images = queue_uploaded_images(
+            request.files.getlist('images'), app.config['MAX_RENTAL_IMAGES']
+        )
 
         # Add rental property to database
         result = db_manager.add_rental_property(current_user['id'], property_data)
@@ -1617,7 +2934,9 @@ def submit_rental_property():
             return jsonify({
                 'success': True,
                 'message': 'Rental property submitted successfully! It will be visible after admin approval.',
-                'rental_id': result['rental_id']
+                'rental_id': result['rental_id'],
+                'image_uploads': image_uploads,
+                'rejected_images': rejected_images
             })
         else:
             return jsonify({'success': False, 'error': result['error']}), 500
@@ -1796,7 +3115,7 @@ def api_admin_analytics():
             'platform_stats': {
                 'total_properties': len(session.get('user_properties', [])),
                 'total_rentals': len(session.get('rental_properties', [])),
-                'total_predictions': len(session.get('predictions', [])),
+                'total_predictions': get_prediction_summary()['total_predictions'],
                 'total_bookings': len(session.get('bookings', []))
             },
             'security_stats': {
@@ -1844,7 +3163,7 @@ def admin_notifications():
 def get_amenities(location):
     """Get nearby amenities for a location"""
     try:
-        amenities_data = get_location_amenities(location)
+        amenities_data = cached_location_amenities(location)
 
         return jsonify({
             'success': True,
@@ -1878,7 +3197,7 @@ def search_properties():
                     prop_price = prop.get('ai_predicted_price', 0)
                     if min_price <= prop_price <= max_price:
                         # Add amenities data
-                        prop['nearby_amenities'] = get_location_amenities(prop['location'])
+                        prop['nearby_amenities'] = cached_location_amenities(prop['location'])
                         filtered_properties.append(prop)
 
         return jsonify({
@@ -1903,26 +3222,28 @@ def about():
 @app.route('/dashboard')
 def dashboard():
     """Enhanced dashboard with real-time data"""
-    # Get latest prediction from session
-    predictions = session.get('predictions', [])
+    # Get latest predictions from the history store
+    owner_key = get_history_owner_key()
+    predictions = get_prediction_history(owner_key, limit=5)[::-1]  # Last 5, oldest first
+    summary = get_prediction_summary(owner_key)
     latest_prediction = predictions[-1] if predictions else None
 
     if latest_prediction:
-        dashboard_data = latest_prediction.get('dashboard_data', get_dashboard_data())
+        dashboard_data = latest_prediction.get('dashboard_data') or get_dashboard_data()
     else:
         dashboard_data = get_dashboard_data()
 
     # Add more dashboard metrics
     dashboard_data['statistics'] = {
-        'total_predictions': len(predictions),
-        'avg_price': sum(p['predicted_price'] for p in predictions) / len(predictions) if predictions else 112.5,
+        'total_predictions': summary['total_predictions'],
+        'avg_price': summary['avg_price'] if summary['avg_price'] is not None else 112.5,
         'popular_locations': ['Whitefield', 'Koramangala', 'Indiranagar'],
         'market_status': 'Rising'
     }
 
     return render_template('dashboard.html',
                          dashboard=dashboard_data,
-                         predictions=predictions[-5:],  # Last 5 predictions
+                         predictions=predictions,  # Last 5 predictions
                          locations=locations)
 
 # ===================== ADMIN PANEL ROUTES =====================
@@ -2048,80 +3369,82 @@ def admin_dashboard():
         return f"Admin Dashboard Error: {str(e)}", 500
 
 def get_admin_statistics():
-    """Get system statistics for admin dashboard from database"""
+    """Get system statistics for admin dashboard, aggregated in SQLite"""
     try:
-        # Get all properties from database
-        properties_result = db_manager.get_all_properties()
-        all_properties = properties_result.get('properties', []) if properties_result['success'] else []
+        conn = db_manager.get_connection()
+        cursor = conn.cursor()
 
-        # Get all users from database
-        users_result = db_manager.get_all_users()
-        all_users = users_result.get('users', []) if users_result['success'] else []
+        # Effective listing price, same precedence as the original per-row loop
+        price_expr = 'COALESCE(NULLIF(ai_predicted_price, 0), NULLIF(expected_price, 0))'
 
-        # Get analytics data
-        analytics_data = get_dashboard_analytics()
+        cursor.execute(f'''
+            SELECT COUNT(*),
+                   SUM(CASE WHEN {price_expr} < 50 THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN {price_expr} >= 50 AND {price_expr} < 100 THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN {price_expr} >= 100 THEN 1 ELSE 0 END),
+                   TOTAL({price_expr})
+            FROM properties
+        ''')
+        total_properties, range_low, range_mid, range_high, revenue_potential = cursor.fetchone()
 
-        # Calculate property status distribution
+        cursor.execute("SELECT COALESCE(status, 'pending'), COUNT(*) FROM properties GROUP BY 1")
         status_counts = {'pending': 0, 'approved': 0, 'rejected': 0}
-        for prop in all_properties:
-            status = prop.get('status', 'pending')
-            status_counts[status] = status_counts.get(status, 0) + 1
+        status_counts.update(dict(cursor.fetchall()))
+
+        cursor.execute("SELECT COALESCE(property_type, 'Unknown'), COUNT(*) FROM properties GROUP BY 1")
+        property_types = dict(cursor.fetchall())
+
+        cursor.execute("SELECT TRIM(COALESCE(location, 'Unknown')), COUNT(*) FROM properties GROUP BY 1")
+        location_distribution = dict(cursor.fetchall())
+
+        cursor.execute('''
+            SELECT COUNT(*), SUM(CASE WHEN is_active THEN 1 ELSE 0 END)
+            FROM users
+        ''')
+        total_users, active_users = cursor.fetchone()
+        active_users = active_users or 0
+
+        cursor.execute('''
+            SELECT u.username, COUNT(p.id)
+            FROM users u LEFT JOIN properties p ON p.user_id = u.id
+            GROUP BY u.id
+        ''')
+        user_property_counts = dict(cursor.fetchall())
+
+        cursor.execute("SELECT strftime('%Y-%m', created_at), COUNT(*) FROM users WHERE created_at IS NOT NULL GROUP BY 1")
+        monthly_registrations = dict(cursor.fetchall())
+
+        cursor.execute('''
+            SELECT * FROM properties
+            ORDER BY created_at DESC
+            LIMIT 5
+        ''')
+        recent_properties = [_property_row_to_dict(cursor, row) for row in cursor.fetchall()]
+        conn.close()
 
-        # Calculate user activity
-        active_users = len([u for u in all_users if u.get('is_active', 1)])
-        inactive_users = len(all_users) - active_users
+        # Get analytics data
+        analytics_data = get_dashboard_analytics()
 
         stats = {
-            'total_properties': len(all_properties),
-            'total_users': len(all_users),
+            'total_properties': total_properties,
+            'total_users': total_users,
             'active_users': active_users,
-            'inactive_users': inactive_users,
+            'inactive_users': total_users - active_users,
             'pending_properties': status_counts['pending'],
             'approved_properties': status_counts['approved'],
             'rejected_properties': status_counts['rejected'],
             'total_predictions': analytics_data.get('total_predictions', 0),
             'total_page_views': analytics_data.get('total_page_views', 0),
             'system_uptime': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'recent_properties': sorted(all_properties, key=lambda x: x.get('created_at', ''), reverse=True)[:5],
-            'property_types': {},
-            'location_distribution': {},
-            'price_ranges': {'0-50L': 0, '50-100L': 0, '100L+': 0},
-            'user_property_counts': {},
-            'monthly_registrations': {},
-            'revenue_potential': 0
+            'recent_properties': recent_properties,
+            'property_types': property_types,
+            'location_distribution': location_distribution,
+            'price_ranges': {'0-50L': range_low or 0, '50-100L': range_mid or 0, '100L+': range_high or 0},
+            'user_property_counts': user_property_counts,
+            'monthly_registrations': monthly_registrations,
+            'revenue_potential': revenue_potential
         }
 
-        # Calculate property type distribution
-        for prop in all_properties:
-            prop_type = prop.get('property_type', 'Unknown')
-            stats['property_types'][prop_type] = stats['property_types'].get(prop_type, 0) + 1
-
-            location = prop.get('location', 'Unknown').strip()
-            stats['location_distribution'][location] = stats['location_distribution'].get(location, 0) + 1
-
-            # Price range analysis
-            price = prop.get('ai_predicted_price', 0) or prop.get('expected_price', 0)
-            if price:
-                if price < 50:
-                    stats['price_ranges']['0-50L'] += 1
-                elif price < 100:
-                    stats['price_ranges']['50-100L'] += 1
-                else:
-                    stats['price_ranges']['100L+'] += 1
-
-                # Add to revenue potential
-                stats['revenue_potential'] += price
-
-        # Calculate user property distribution
-        for user in all_users:
-            username = user.get('username', 'Unknown')
-            property_count = user.get('property_count', 0)
-            stats['user_property_counts'][username] = property_count
-
-        # Calculate monthly registrations (simplified)
-        current_month = datetime.now().strftime('%Y-%m')
-        stats['monthly_registrations'][current_month] = len(all_users)
-
         return stats
     except Exception as e:
         # Return default stats structure if there's an error
@@ -2191,6 +3514,7 @@ def admin_property_action(property_id):
 
             if result['success']:
                 if action == 'approve':
+                    register_approved_locations('properties', [property_id])
                     message = 'Property approved successfully'
                 elif action == 'reject':
                     message = 'Property rejected successfully'
@@ -2274,6 +3598,9 @@ def admin_user_action_by_id(user_id):
         conn.commit()
         conn.close()
 
+        if action in ('block', 'delete'):
+            invalidate_user_sessions(user_id=user_id)
+
         # Log admin action
         log_admin_action(f'user_{action}', {
             'user_id': user_id,
@@ -2290,88 +3617,89 @@ def admin_user_action_by_id(user_id):
 @app.route('/admin/analytics')
 @admin_required
 def admin_analytics():
-    """Admin analytics page with comprehensive insights from database"""
+    """Admin analytics page served from the incrementally maintained rollups"""
     try:
-        # Get all properties from database
-        properties_result = db_manager.get_all_properties()
-        all_properties = properties_result.get('properties', []) if properties_result['success'] else []
+        rollups = get_property_rollups()
+        total_properties = rollups['all'].get('total', (0, 0, 0))[0]
 
-        # Get all users from database
-        users_result = db_manager.get_all_users()
-        all_users = users_result.get('users', []) if users_result['success'] else []
+        conn = db_manager.get_connection()
+        cursor = conn.cursor()
+
+        # Min/max come straight off the price expression index
+        price_col = ANALYTICS_PRICE_SQL.format(row='')
+        cursor.execute(f'''
+            SELECT (SELECT MIN({price_col}) FROM properties WHERE {price_col} > 0),
+                   (SELECT MAX({price_col}) FROM properties)
+        ''')
+        min_price, max_price = cursor.fetchone()
+
+        # Listings per user come from the 'user' rollup buckets, not a scan of properties
+        cursor.execute('''
+            SELECT COUNT(*),
+                   SUM(CASE WHEN is_active THEN 1 ELSE 0 END),
+                   (SELECT COUNT(*) FROM property_rollups WHERE dimension = 'user' AND count > 0)
+            FROM users
+        ''')
+        total_users, active_users, users_with_properties = cursor.fetchone()
+        active_users = active_users or 0
+
+        cursor.execute('''
+            SELECT u.*, r.count AS property_count
+            FROM property_rollups r JOIN users u ON u.id = CAST(r.bucket AS INTEGER)
+            WHERE r.dimension = 'user' AND r.count > 0
+            ORDER BY r.count DESC
+            LIMIT 5
+        ''')
+        columns = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+        if len(rows) < 5:
+            # Pad with users who have no listings, as the LEFT JOIN used to
+            cursor.execute('''
+                SELECT u.*, 0 AS property_count FROM users u
+                WHERE NOT EXISTS (SELECT 1 FROM property_rollups r
+                                  WHERE r.dimension = 'user' AND r.bucket = CAST(u.id AS TEXT) AND r.count > 0)
+                ORDER BY u.id
+                LIMIT ?
+            ''', (5 - len(rows),))
+            rows += cursor.fetchall()
+        top_users = [{k: v for k, v in zip(columns, row) if k not in ('password_hash', 'salt')}
+                     for row in rows]
+
+        cursor.execute('SELECT * FROM properties ORDER BY id DESC LIMIT 10')
+        recent_activity = [_property_row_to_dict(cursor, row) for row in cursor.fetchall()][::-1]
+        conn.close()
+
+        priced = rollups['all'].get('total', (0, 0, 0))
+        price_ranges = {'0-50L': 0, '50-100L': 0, '100L+': 0}
+        price_ranges.update({bucket: values[0] for bucket, values in rollups['price_range'].items()})
 
-        # Calculate comprehensive analytics
         analytics_data = {
-            'total_properties': len(all_properties),
-            'total_users': len(all_users),
-            'property_by_type': {},
-            'property_by_location': {},
-            'property_by_status': {},
+            'total_properties': total_properties,
+            'total_users': total_users,
+            'property_by_type': {bucket: values[0] for bucket, values in rollups['type'].items()},
+            'property_by_location': {bucket: values[0] for bucket, values in rollups['location'].items()},
+            'property_by_status': {bucket: values[0] for bucket, values in rollups['status'].items()},
             'user_activity': {
-                'active_users': len([u for u in all_users if u.get('is_active', 1)]),
-                'inactive_users': len([u for u in all_users if not u.get('is_active', 1)]),
-                'users_with_properties': len([u for u in all_users if u.get('property_count', 0) > 0])
+                'active_users': active_users,
+                'inactive_users': total_users - active_users,
+                'users_with_properties': users_with_properties
             },
             'price_analytics': {
-                'avg_price': 0,
-                'min_price': 0,
-                'max_price': 0,
-                'total_value': 0,
-                'price_ranges': {'0-50L': 0, '50-100L': 0, '100L+': 0}
+                'avg_price': priced[1] / priced[2] if priced[2] else 0,
+                'min_price': min_price or 0,
+                'max_price': max_price or 0,
+                'total_value': priced[1],
+                'price_ranges': price_ranges
             },
-            'monthly_listings': {},
-            'top_users': [],
-            'recent_activity': all_properties[-10:] if all_properties else []
+            'monthly_listings': dict(sorted((bucket, values[0]) for bucket, values in rollups['month'].items())),
+            'top_users': top_users,
+            'recent_activity': recent_activity
         }
 
-        # Calculate analytics from database data
-        prices = []
-
-        if all_properties:
-            # Property type distribution
-            for prop in all_properties:
-                prop_type = prop.get('property_type', 'Unknown')
-                analytics_data['property_by_type'][prop_type] = analytics_data['property_by_type'].get(prop_type, 0) + 1
-
-                # Location distribution
-                location = prop.get('location', 'Unknown').strip()
-                analytics_data['property_by_location'][location] = analytics_data['property_by_location'].get(location, 0) + 1
-
-                # Status distribution
-                status = prop.get('status', 'pending')
-                analytics_data['property_by_status'][status] = analytics_data['property_by_status'].get(status, 0) + 1
-
-                # Price analytics
-                price = prop.get('expected_price') or prop.get('ai_predicted_price', 0)
-                if price:
-                    prices.append(price)
-                    analytics_data['price_analytics']['total_value'] += price
-
-                    if price < 50:
-                        analytics_data['price_analytics']['price_ranges']['0-50L'] += 1
-                    elif price < 100:
-                        analytics_data['price_analytics']['price_ranges']['50-100L'] += 1
-                    else:
-                        analytics_data['price_analytics']['price_ranges']['100L+'] += 1
-
-                # Monthly listings
-                if prop.get('created_at'):
-                    month = prop['created_at'][:7]  # YYYY-MM format
-                    analytics_data['monthly_listings'][month] = analytics_data['monthly_listings'].get(month, 0) + 1
-
-            # Calculate price statistics
-            if prices:
-                analytics_data['price_analytics']['avg_price'] = sum(prices) / len(prices)
-                analytics_data['price_analytics']['min_price'] = min(prices)
-                analytics_data['price_analytics']['max_price'] = max(prices)
-
-        # Calculate top users by property count
-        analytics_data['top_users'] = sorted(all_users, key=lambda x: x.get('property_count', 0), reverse=True)[:5]
-
         # Add system health metrics
         analytics_data['system_health'] = {
             'database_status': 'Connected',
-            'total_records': len(all_properties) + len(all_users),
+            'total_records': total_properties + total_users,
             'data_integrity': 'Good',
             'last_backup': 'N/A'
         }
@@ -2380,7 +3708,7 @@ def admin_analytics():
         recent_logs = session.get('admin_logs', [])[-20:]  # Last 20 actions
         analytics_data['recent_admin_activity'] = recent_logs
 
-        log_admin_action('view_analytics', {'total_properties': len(all_properties)})
+        log_admin_action('view_analytics', {'total_properties': total_properties})
 
         return render_template('admin_analytics.html',
                              analytics=analytics_data,
@@ -2419,9 +3747,9 @@ def admin_settings():
                 'csrf_protection': 'Enabled'
             },
             'system_settings': {
-                'max_image_upload': 5,
+                'max_image_upload': app.config['MAX_PROPERTY_IMAGES'],
                 'max_file_size': '10MB',
-                'allowed_file_types': ['jpg', 'jpeg', 'png', 'gif'],
+                'allowed_file_types': sorted(ALLOWED_EXTENSIONS),
                 'session_timeout': '24 hours',
                 'auto_approval': False,
                 'email_notifications': False,
@@ -2445,59 +3773,112 @@ def admin_settings():
         log_admin_action('settings_error', {'error': str(e)})
         return f"Admin Settings Error: {str(e)}", 500
 
+# Stay well under SQLite's bound-parameter limit per IN (...) list
+BULK_CHUNK_SIZE = 500
+
+# target_type -> action -> statements run per chunk ({ids} is the IN placeholder list)
+BULK_ACTIONS = {
+    'properties': {
+        'approve': [('UPDATE properties SET status = ? WHERE id IN ({ids})', ('approved',))],
+        'reject': [('UPDATE properties SET status = ? WHERE id IN ({ids})', ('rejected',))],
+        'delete': [('DELETE FROM properties WHERE id IN ({ids})', ())]
+    },
+    'users': {
+        'activate': [('UPDATE users SET is_active = 1 WHERE id IN ({ids})', ())],
+        'deactivate': [('UPDATE users SET is_active = 0 WHERE id IN ({ids})', ())],
+        'delete': [
+            # Delete user's properties and sessions first
+            ('DELETE FROM properties WHERE user_id IN ({ids})', ()),
+            ('DELETE FROM user_sessions WHERE user_id IN ({ids})', ()),
+            ('DELETE FROM users WHERE id IN ({ids})', ())
+        ]
+    }
+}
+
 @app.route('/admin/bulk-actions', methods=['POST'])
 @admin_required
 def admin_bulk_actions():
-    """Admin bulk actions for properties and users"""
+    """Admin bulk actions for properties and users, applied in one transaction"""
     try:
         action = request.form.get('action')
         target_type = request.form.get('target_type')  # 'properties' or 'users'
-        target_ids = request.form.getlist('target_ids')
+        raw_ids = request.form.getlist('target_ids')
+        dry_run = request.form.get('dry_run', '').lower() in ('1', 'true', 'on', 'yes')
 
-        if not action or not target_type or not target_ids:
+        if not action or not target_type or not raw_ids:
             return jsonify({'success': False, 'error': 'Missing required parameters'}), 400
 
+        # Normalize before de-duplicating so "03" and "3" are the same row
+        invalid_ids = [raw_id for raw_id in raw_ids if not re.fullmatch(r'\s*[0-9]+\s*', raw_id)]
+        if invalid_ids:
+            return jsonify({'success': False, 'error': 'Target ids must be integers', 'invalid_ids': invalid_ids}), 400
+        target_ids = list(dict.fromkeys(int(raw_id) for raw_id in raw_ids))  # De-duplicated, order kept
+
+        if action not in BULK_ACTIONS.get(target_type, {}):
+            return jsonify({'success': False, 'error': 'Invalid action'}), 400
+
+        table = 'properties' if target_type == 'properties' else 'users'
+        label = 'Property' if target_type == 'properties' else 'User'
+
         conn = db_manager.get_connection()
         cursor = conn.cursor()
 
-        results = []
+        try:
+            existing = set()
+            for i in range(0, len(target_ids), BULK_CHUNK_SIZE):
+                chunk = target_ids[i:i + BULK_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f'SELECT id FROM {table} WHERE id IN ({placeholders})', chunk)
+                existing.update(row[0] for row in cursor.fetchall())
+
+                if not dry_run:
+                    for statement, params in BULK_ACTIONS[target_type][action]:
+                        cursor.execute(statement.format(ids=placeholders), list(params) + chunk)
+
+            if not dry_run:
+                conn.commit()
+        except Exception:
+            # All-or-nothing: a failure leaves no part of the batch applied
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
 
-        if target_type == 'properties':
-            for prop_id in target_ids:
-                if action == 'approve':
-                    cursor.execute('UPDATE properties SET status = ? WHERE id = ?', ('approved', prop_id))
-                elif action == 'reject':
-                    cursor.execute('UPDATE properties SET status = ? WHERE id = ?', ('rejected', prop_id))
-                elif action == 'delete':
-                    cursor.execute('DELETE FROM properties WHERE id = ?', (prop_id,))
-                results.append(f'Property {prop_id} {action}d')
+        if not dry_run and target_type == 'properties' and action == 'approve':
+            register_approved_locations('properties', target_ids)
 
-        elif target_type == 'users':
-            for user_id in target_ids:
-                if action == 'activate':
-                    cursor.execute('UPDATE users SET is_active = 1 WHERE id = ?', (user_id,))
-                elif action == 'deactivate':
-                    cursor.execute('UPDATE users SET is_active = 0 WHERE id = ?', (user_id,))
-                elif action == 'delete':
-                    # Delete user's properties first
-                    cursor.execute('DELETE FROM properties WHERE user_id = ?', (user_id,))
-                    cursor.execute('DELETE FROM user_sessions WHERE user_id = ?', (user_id,))
-                    cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
-                results.append(f'User {user_id} {action}d')
+        past = action + 'd' if action.endswith('e') else action + 'ed'
+        results = []
+        for target_id in target_ids:
+            if target_id not in existing:
+                results.append({'id': target_id, 'status': 'not_found', 'message': f'{label} {target_id} not found'})
+            elif dry_run:
+                results.append({'id': target_id, 'status': f'would_{action}', 'message': f'{label} {target_id} would be {past}'})
+            else:
+                results.append({'id': target_id, 'status': 'applied', 'message': f'{label} {target_id} {past}'})
 
-        conn.commit()
-        conn.close()
+        if not dry_run and target_type == 'users' and action in ('deactivate', 'delete'):
+            for user_id in target_ids:
+                invalidate_user_sessions(user_id=user_id)
 
         log_admin_action('bulk_action', {
             'action': action,
             'target_type': target_type,
             'count': len(target_ids),
+            'applied': len(existing),
+            'dry_run': dry_run,
             'admin': session.get('admin_username')
         })
 
         return jsonify({
             'success': True,
-            'message': f'Bulk {action} completed successfully',
+            'message': f'Bulk {action} {"dry run " if dry_run else ""}completed successfully',
+            'dry_run': dry_run,
+            'summary': {
+                'requested': len(target_ids),
+                'applied': 0 if dry_run else len(existing),
+                'not_found': len(target_ids) - len(existing)
+            },
             'results': results
         })
 
@@ -2523,8 +3904,35 @@ def admin_system_control():
             cursor.execute('DELETE FROM user_sessions')
             conn.commit()
             conn.close()
+            invalidate_user_sessions()
             message = 'All user sessions cleared successfully'
 
+        elif action == 'warm_amenities':
+            computed = warm_amenities_cache()
+            message = f'Amenities cache warmed for {computed} locations'
+
+        elif action == 'clear_amenities_cache':
+            amenities_cache.clear()
+            message = 'Amenities cache cleared successfully'
+
+        elif action == 'sweep_sessions':
+            removed = purge_expired_sessions()
+            message = f'Removed {removed} expired/inactive sessions'
+
+        elif action == 'rebuild_rollups':
+            conn = db_manager.get_connection()
+            cursor = conn.cursor()
+            rebuild_property_rollups(cursor)
+            conn.commit()
+            conn.close()
+            message = 'Analytics rollups rebuilt successfully'
+
+        elif action == 'gc_images':
+            report = collect_orphan_images(dry_run=request.form.get('dry_run') == 'true')
+            message = f"Removed {report['orphaned']} orphaned image blobs ({report['bytes_freed'] / 1024 / 1024:.1f} MB)"
+            if report['dry_run']:
+                message = f"Dry run: {report['orphaned']} orphaned image blobs ({report['bytes_freed'] / 1024 / 1024:.1f} MB) would be removed"
+
         elif action == 'backup_database':
             # Simulate database backup
             message = 'Database backup initiated (feature not implemented)'
@@ -2547,6 +3955,144 @@ def admin_system_control():
         log_admin_action('system_control_error', {'error': str(e)})
         return jsonify({'success': False, 'error': str(e)}), 500
 
+EXPORT_BATCH_SIZE = 1000
+LISTING_EXPORT_COLUMNS = ('owner_username', 'owner_email')
+EXPORT_DATASETS = {
+    'properties': {
+        'columns': ('id', 'user_id', 'property_type', 'location', 'area_type', 'size', 'total_sqft', 'bath',
+                    'balcony', 'availability', 'expected_price', 'ai_predicted_price', 'description', 'amenities',
+                    'images', 'status', 'created_at', 'updated_at', 'approved_at', 'approved_by'),
+        'table': 'properties',
+        'json_columns': ('amenities', 'images')
+    },
+    'rentals': {
+        'columns': ('id', 'user_id', 'property_type', 'location', 'size', 'total_sqft', 'bedrooms', 'bathrooms',
+                    'balcony', 'rent_amount', 'security_deposit', 'maintenance_charges', 'description', 'amenities',
+                    'images', 'available_from', 'lease_duration', 'furnishing_status', 'parking_available',
+                    'pet_friendly', 'status', 'created_at', 'updated_at', 'approved_by', 'approved_at'),
+        'table': 'rental_properties',
+        'json_columns': ('amenities', 'images')
+    },
+    'users': {
+        # Password hashes and salts are never exported
+        'columns': ('id', 'username', 'email', 'full_name', 'phone', 'created_at', 'last_login', 'is_active',
+                    'email_verified'),
+        'table': 'users',
+        'json_columns': ()
+    }
+}
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def _csv_safe(value):
+    """Neutralize text a spreadsheet would evaluate as a formula"""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def _export_query(dataset, status=None):
+    """SELECT statement, params and output column names for an export"""
+    spec = EXPORT_DATASETS[dataset]
+    columns = [f"t.{column}" for column in spec['columns']]
+    names = list(spec['columns'])
+    sql = f"FROM {spec['table']} t"
+    if dataset != 'users':
+        columns += ['u.username', 'u.email']
+        names += list(LISTING_EXPORT_COLUMNS)
+        sql += ' LEFT JOIN users u ON u.id = t.user_id'
+    params = []
+    if status and dataset != 'users':
+        sql += ' WHERE t.status = ?'
+        params.append(status)
+    return f"SELECT {', '.join(columns)} {sql} ORDER BY t.id", params, names
+
+def iter_export_rows(dataset, status=None):
+    """Yield (names, row) batches straight from a cursor, EXPORT_BATCH_SIZE rows at a time"""
+    sql, params, names = _export_query(dataset, status)
+    conn = db_manager.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            yield names, rows
+    finally:
+        conn.close()
+
+def generate_ndjson_export(dataset, status=None):
+    """One JSON object per line; JSON text columns are emitted as real arrays/objects"""
+    json_columns = EXPORT_DATASETS[dataset]['json_columns']
+    for names, rows in iter_export_rows(dataset, status):
+        lines = []
+        for row in rows:
+            record = dict(zip(names, row))
+            for column in json_columns:
+                try:
+                    record[column] = json.loads(record[column]) if record[column] else []
+                except (TypeError, ValueError):
+                    pass  # Keep malformed values as their raw text
+            lines.append(json.dumps(record, default=str))
+        yield '\n'.join(lines) + '\n'
+
+def generate_csv_export(dataset, status=None):
+    """Header row, then one CSV chunk per cursor batch (JSON columns stay as JSON text)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header_written = False
+    for names, rows in iter_export_rows(dataset, status):
+        if not header_written:
+            writer.writerow(names)
+            header_written = True
+        writer.writerows([_csv_safe(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if not header_written:
+        yield ','.join(_export_query(dataset)[2]) + '\r\n'
+
+@app.route('/api/admin/export/<dataset>')
+@admin_required
+def admin_export(dataset):
+    """Stream a full dump of properties, rentals or users as NDJSON (default) or CSV"""
+    export_format = request.args.get('format', 'ndjson').lower()
+    status = request.args.get('status') or None
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({'success': False, 'error': f"Unknown dataset. Use one of: {', '.join(EXPORT_DATASETS)}"}), 400
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': 'Format must be ndjson or csv'}), 400
+    if status and dataset == 'users':
+        return jsonify({'success': False, 'error': 'The status filter only applies to properties and rentals'}), 400
+
+    log_admin_action('export_data', {
+        'dataset': dataset,
+        'format': export_format,
+        'status': status,
+        'admin': session.get('admin_username')
+    })
+
+    generate = generate_ndjson_export if export_format == 'ndjson' else generate_csv_export
+    filename = f"{dataset}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+    return Response(generate(dataset, status), mimetype=EXPORT_FORMATS[export_format], headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-store'
+    })
+
+@app.route('/api/admin/prediction-cache', methods=['GET', 'POST'])
+@admin_required
+def admin_prediction_cache():
+    """Prediction cache statistics; POST with action=clear empties the cache"""
+    if request.method == 'POST' and request.form.get('action') == 'clear':
+        prediction_cache.clear()
+        log_admin_action('prediction_cache_clear', {'admin': session.get('admin_username')})
+
+    return jsonify({
+        'success': True,
+        'deterministic': app.config['PREDICTION_DETERMINISTIC'],
+        'cache': prediction_cache.stats()
+    })
+
 @app.route('/admin/rental-properties')
 @admin_required
 def admin_rental_properties():
@@ -2603,6 +4149,7 @@ def admin_rental_property_action(rental_id):
 
             if result['success']:
                 if action == 'approve':
+                    register_approved_locations('rental_properties', [rental_id])
                     message = 'Rental property approved successfully! It is now visible to all users.'
                 elif action == 'reject':
                     message = 'Rental property rejected successfully.'
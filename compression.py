@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+WSGI middleware that compresses text responses (JSON, HTML, CSV, ...).
+
+Brotli is preferred when installed and accepted, otherwise gzip. Responses
+with a known length below ``min_size`` are left alone; streamed responses
+(no Content-Length) are compressed incrementally and flushed every
+``flush_size`` input bytes, so clients still receive data as it is produced
+without tiny chunks ruining the compression ratio. Images and anything
+that already carries a Content-Encoding pass through untouched.
+"""
+
+import zlib
+
+from static_assets import accepted_encodings, brotli
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/x-ndjson', 'application/javascript', 'application/xml',
+    'image/svg+xml', 'text/html', 'text/css', 'text/csv', 'text/plain', 'text/javascript', 'text/xml'
+}
+
+
+class _GzipStream:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, chunk):
+        return self._compressor.compress(chunk)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, chunk):
+        return self._compressor.process(chunk)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class _PrefixedBody:
+    """Response body whose first chunks were already pulled from the app's iterable"""
+
+    def __init__(self, prefix, iterator, body):
+        self._prefix = prefix
+        self._iterator = iterator
+        self._body = body
+
+    def __iter__(self):
+        yield from self._prefix
+        yield from self._iterator
+
+    def close(self):
+        if hasattr(self._body, 'close'):
+            self._body.close()
+
+
+class CompressionMiddleware:
+    """Negotiate gzip/brotli per request and compress eligible response bodies"""
+
+    def __init__(self, app, min_size=1024, gzip_level=6, brotli_quality=4, flush_size=16 * 1024):
+        self.app = app
+        self.min_size = min_size
+        self.flush_size = flush_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.stats = {'compressed': 0, 'passthrough': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+    def _negotiate(self, environ):
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            return None
+        accepted = accepted_encodings(environ.get('HTTP_ACCEPT_ENCODING'))
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted or '*' in accepted:
+            return 'gzip'
+        return None
+
+    def _stream(self, encoding):
+        return _BrotliStream(self.brotli_quality) if encoding == 'br' else _GzipStream(self.gzip_level)
+
+    def _eligible(self, status, headers):
+        code = int(status.split(' ', 1)[0])
+        if code < 200 or code in (204, 206, 304):
+            return False
+        names = {name.lower(): value for name, value in headers}
+        content_type = names.get('content-type', '').split(';', 1)[0].strip().lower()
+        if content_type not in COMPRESSIBLE_TYPES:
+            return False
+        if 'content-encoding' in names or 'no-transform' in names.get('cache-control', '').lower():
+            return False
+        length = names.get('content-length')
+        return length is None or int(length) >= self.min_size
+
+    @staticmethod
+    def _rewrite_headers(headers, encoding, length=None):
+        rewritten = []
+        vary = None
+        for name, value in headers:
+            lower = name.lower()
+            if lower == 'content-length':
+                continue
+            if lower == 'vary':
+                vary = value
+                continue
+            if lower == 'etag' and not value.startswith('W/'):
+                value = f"W/{value}"  # The encoded bytes differ from the identity representation
+            rewritten.append((name, value))
+        if vary is None:
+            vary = 'Accept-Encoding'
+        elif 'accept-encoding' not in vary.lower():
+            vary = f"{vary}, Accept-Encoding"
+        rewritten.append(('Vary', vary))
+        rewritten.append(('Content-Encoding', encoding))
+        if length is not None:
+            rewritten.append(('Content-Length', str(length)))
+        return rewritten
+
+    def __call__(self, environ, start_response):
+        encoding = self._negotiate(environ)
+        if encoding is None:
+            return self.app(environ, start_response)
+
+        captured = {}
+
+        def capture_start_response(status, headers, exc_info=None):
+            captured['status'], captured['headers'], captured['exc_info'] = status, headers, exc_info
+
+            def write(data):
+                raise RuntimeError('CompressionMiddleware does not support the WSGI write() callable')
+            return write
+
+        body = self.app(environ, capture_start_response)
+        if 'status' not in captured:
+            # Generator apps may call start_response lazily, at the latest before their first chunk
+            iterator = iter(body)
+            prefix = []
+            try:
+                for chunk in iterator:
+                    prefix.append(chunk)
+                    if chunk:
+                        break
+                if 'status' not in captured:
+                    raise RuntimeError('WSGI application did not call start_response')
+            except BaseException:
+                if hasattr(body, 'close'):
+                    body.close()
+                raise
+            body = _PrefixedBody(prefix, iterator, body)
+        status, headers = captured['status'], captured['headers']
+
+        if not self._eligible(status, headers):
+            self.stats['passthrough'] += 1
+            start_response(status, headers, captured['exc_info'])
+            return body
+
+        self.stats['compressed'] += 1
+        if any(name.lower() == 'content-length' for name, _ in headers):
+            # Buffered response: compress in one go and keep a Content-Length
+            try:
+                data = b''.join(body)
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+            stream = self._stream(encoding)
+            compressed = stream.compress(data) + stream.finish()
+            self.stats['bytes_in'] += len(data)
+            self.stats['bytes_out'] += len(compressed)
+            start_response(status, self._rewrite_headers(headers, encoding, len(compressed)), captured['exc_info'])
+            return [compressed]
+
+        start_response(status, self._rewrite_headers(headers, encoding), captured['exc_info'])
+        return self._compress_stream(body, self._stream(encoding))
+
+    def _compress_stream(self, body, stream):
+        pending = 0  # Input bytes since the last flush
+        try:
+            for chunk in body:
+                if not chunk:
+                    continue
+                self.stats['bytes_in'] += len(chunk)
+                pending += len(chunk)
+                compressed = stream.compress(chunk)
+                if pending >= self.flush_size:
+                    compressed += stream.flush()
+                    pending = 0
+                if compressed:
+                    self.stats['bytes_out'] += len(compressed)
+                    yield compressed
+            tail = stream.finish()
+            self.stats['bytes_out'] += len(tail)
+            yield tail
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Lazy, memory-mapped access to the housing dataset.
+
+The CSV is converted once into one .npy file per column. Workers then open
+those files with ``mmap_mode='r'`` and only touch the columns they use.
+Forked gunicorn workers share the same page-cache pages, so boot time and RSS
+stay flat as the dataset grows. Each cache directory is keyed by the CSV's
+size and mtime, so a changed CSV gets a fresh directory and a cache that a
+worker may be reading is never replaced underneath it.
+
+Convert ahead of deployment with:
+    python dataset.py housing.csv
+"""
+
+import os
+import sys
+import json
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.environ.get('DATASET_CACHE_DIR', '.dataset_cache')
+MANIFEST_NAME = 'manifest.json'
+
+
+class LazyDataset:
+    """Column store backed by memory-mapped .npy files"""
+
+    def __init__(self, csv_path, cache_dir=DEFAULT_CACHE_DIR):
+        self.csv_path = csv_path
+        self.cache_root = cache_dir
+        self.name = os.path.splitext(os.path.basename(csv_path))[0]
+        signature = self._source_signature()
+        self.cache_dir = os.path.join(cache_dir, f"{self.name}-{signature['size']}-{signature['mtime']}")
+        self._columns = {}
+        self._lock = threading.Lock()
+        self.manifest = self._load_or_build_manifest()
+
+    @property
+    def columns(self):
+        return list(self.manifest['columns'])
+
+    def __contains__(self, name):
+        return name in self.manifest['columns']
+
+    def __len__(self):
+        return self.manifest['rows']
+
+    def column(self, name):
+        """Return a read-only memory-mapped array for a column, opened on first use"""
+        array = self._columns.get(name)
+        if array is None:
+            if name not in self.manifest['columns']:
+                raise KeyError(name)
+            with self._lock:
+                array = self._columns.get(name)
+                if array is None:
+                    path = os.path.join(self.cache_dir, self.manifest['columns'][name]['file'])
+                    array = np.load(path, mmap_mode='r')
+                    self._columns[name] = array
+        return array
+
+    def frame(self, names):
+        """Build a pandas DataFrame for the requested columns only"""
+        return pd.DataFrame({name: self.column(name) for name in names})
+
+    def _source_signature(self):
+        stat = os.stat(self.csv_path)
+        return {'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.cache_dir, MANIFEST_NAME)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get('source') == self._source_signature() else None
+
+    def _load_or_build_manifest(self):
+        return self._read_manifest() or self.build()
+
+    def build(self):
+        """Convert the CSV into per-column .npy files and publish them atomically"""
+        df = pd.read_csv(self.csv_path)
+        staging_dir = f"{self.cache_dir}.tmp{os.getpid()}"
+        os.makedirs(staging_dir, exist_ok=True)
+
+        manifest = {'source': self._source_signature(), 'rows': len(df), 'columns': {}}
+        for i, name in enumerate(df.columns):
+            series = df[name]
+            if pd.api.types.is_numeric_dtype(series):
+                values = series.to_numpy(dtype=np.float64 if series.hasnans else series.dtype)
+            else:
+                # Fixed-width unicode keeps string columns mmap-able (object arrays are not)
+                values = series.fillna('').astype(str).to_numpy(dtype=np.str_)
+            filename = f"col_{i}.npy"
+            np.save(os.path.join(staging_dir, filename), values)
+            manifest['columns'][str(name)] = {'file': filename, 'dtype': values.dtype.str}
+
+        with open(os.path.join(staging_dir, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f)
+
+        # Another worker may have published first; its copy is equivalent and may already be in use
+        try:
+            os.rename(staging_dir, self.cache_dir)
+        except OSError:
+            if self._read_manifest() is None:
+                # Left behind half-written (e.g. a crash mid-copy); nobody can be using it
+                shutil.rmtree(self.cache_dir, ignore_errors=True)
+                try:
+                    os.rename(staging_dir, self.cache_dir)
+                except OSError:
+                    pass
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+        return manifest
+
+    def prune_stale(self):
+        """Delete caches built from older versions of this CSV; returns directories removed"""
+        removed = 0
+        if not os.path.isdir(self.cache_root):
+            return removed
+        current = os.path.basename(self.cache_dir)
+        for entry in os.listdir(self.cache_root):
+            if entry.startswith(f"{self.name}-") and entry != current and '.tmp' not in entry:
+                shutil.rmtree(os.path.join(self.cache_root, entry), ignore_errors=True)
+                removed += 1
+        return removed
+
+
+def find_dataset_csv():
+    """Return the first housing CSV available in the working directory"""
+    for path in ('housing.csv', 'Bengaluru_House_Data.csv'):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def unique_locations(dataset):
+    """Sorted unique, non-empty locations from a dataset's location column"""
+    if dataset is None or 'location' not in dataset:
+        return []
+    values = np.unique(dataset.column('location'))
+    return [str(loc) for loc in values if loc and loc != 'nan']
+
+
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else find_dataset_csv()
+    if not csv_path:
+        print("❌ No housing CSV found")
+        sys.exit(1)
+
+    dataset = LazyDataset(csv_path)
+    dataset.prune_stale()
+
+    print(f"✅ Converted {csv_path}: {len(dataset.manifest['columns'])} columns, {dataset.manifest['rows']} rows -> {dataset.cache_dir}")
+
+    # Precompute derived data too, so workers only load it
+    from trends import TrendStore
+    print(f"✅ Trends ready for {len(TrendStore.for_dataset(dataset))} locations")
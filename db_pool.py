@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Pooled SQLite connections for real_estate.db.
+
+Wraps ``db_manager.get_connection`` so every caller (db_manager methods and the
+admin routes alike) reuses a per-thread connection instead of opening and
+closing one per call. Connections are switched to WAL journaling with a busy
+timeout, so readers in other gunicorn workers are not blocked by a writer.
+Reusing connections also keeps sqlite3's per-connection prepared-statement
+cache warm.
+"""
+
+import os
+import sqlite3
+import threading
+
+DEFAULT_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+MAX_IDLE_PER_THREAD = 2
+
+
+class PooledConnection:
+    """sqlite3 connection proxy whose close() hands the connection back to the pool"""
+
+    def __init__(self, pool, conn):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_row_factory', conn.row_factory)
+        object.__setattr__(self, '_closed', False)
+
+    def __getattr__(self, name):
+        if self._closed:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self._conn.__exit__(*exc_info)
+
+    def close(self):
+        if self._closed:
+            return
+        object.__setattr__(self, '_closed', True)
+        conn = self._conn
+        if conn.in_transaction:
+            # Uncommitted work is discarded, exactly as a real close() would
+            conn.rollback()
+        conn.row_factory = self._row_factory
+        self._pool.release(conn)
+
+
+class ConnectionPool:
+    """Per-thread (and per-greenlet under gevent) pool of configured SQLite connections"""
+
+    def __init__(self, factory, busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS):
+        self.factory = factory
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self.stats = {'created': 0, 'reused': 0}
+
+    def _idle(self):
+        # Connections inherited across a fork must not be shared with the parent
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.pid = os.getpid()
+            self._local.idle = []
+        return self._local.idle
+
+    def _configure(self, conn):
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+
+    def connection(self):
+        """Check out a connection; nested checkouts in one thread get separate connections"""
+        idle = self._idle()
+        if idle:
+            conn = idle.pop()
+            self.stats['reused'] += 1
+        else:
+            conn = self._configure(self.factory())
+            self.stats['created'] += 1
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        idle = self._idle()
+        if len(idle) < MAX_IDLE_PER_THREAD:
+            idle.append(conn)
+        else:
+            conn.close()
+
+
+def install_connection_pool(db_manager, busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS):
+    """Route db_manager.get_connection through a ConnectionPool and return the pool"""
+    pool = ConnectionPool(db_manager.get_connection, busy_timeout_ms)
+    db_manager.get_connection = pool.connection
+    return pool
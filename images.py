@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Background image ingestion for listing uploads.
+
+Requests only stream each upload to a staging file (hashing it on the way)
+and get back the final, content-addressed URLs. A small thread pool then
+validates the image, strips its metadata and writes thumbnail/medium/full
+JPEG variants, so gunicorn workers are not held up by decoding and resizing.
+
+Files are laid out as ``<root>/<digest[:2]>/<digest>-<variant>.jpg`` where
+``digest`` is the SHA-256 of the uploaded bytes; the same photo uploaded twice
+maps to the same files and is only processed once. Listings reference blobs by
+URL, so reference counts are derived from their ``images`` columns and blobs no
+listing points to can be garbage collected (see ``stored_digests``/``remove``).
+"""
+
+import os
+import re
+import time
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+
+ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'webp'}
+VARIANTS = {'thumb': 320, 'medium': 800, 'full': 1600}  # Longest edge in pixels
+MAX_IMAGE_BYTES = int(os.environ.get('MAX_IMAGE_BYTES', 10 * 1024 * 1024))
+MAX_IMAGE_PIXELS = 40_000_000
+JPEG_QUALITY = 82
+CHUNK_SIZE = 64 * 1024
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+URL_DIGEST_PATTERN = re.compile(r'/([0-9a-f]{64})-(?:thumb|medium|full)\.jpg$')
+
+# Pillow only raises above twice this limit (it merely warns in between), so
+# _process also checks the header dimensions itself before decoding anything
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+
+def digest_from_url(url):
+    """Blob digest referenced by an image URL, or None for legacy/external URLs"""
+    match = URL_DIGEST_PATTERN.search(url) if isinstance(url, str) else None
+    return match.group(1) if match else None
+
+
+def file_digest(path):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImagePipeline:
+    """Stage uploads in the request, process them on a background worker pool"""
+
+    def __init__(self, root, url_prefix, workers=2):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip('/')
+        self.staging_dir = os.path.join(root, '.staging')
+        self.workers = workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.stats = {'staged': 0, 'processed': 0, 'skipped': 0, 'failed': 0}
+
+    def _pool(self):
+        # A pool inherited across a fork has no threads; start a fresh one per worker
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='image-worker')
+                self._pid = os.getpid()
+            return self._executor
+
+    def path(self, digest, variant):
+        return os.path.join(self.root, digest[:2], f"{digest}-{variant}.jpg")
+
+    def urls(self, digest):
+        """Final URL of every variant of an image"""
+        return {variant: f"{self.url_prefix}/{digest[:2]}/{digest}-{variant}.jpg" for variant in VARIANTS}
+
+    def _staging_path(self, digest):
+        return os.path.join(self.staging_dir, f"{digest}.upload")
+
+    def _failed_path(self, digest):
+        return os.path.join(self.root, digest[:2], f"{digest}.failed")
+
+    def submit(self, file):
+        """Stream an uploaded file to staging and queue it; returns its digest and pending URLs"""
+        extension = file.filename.rsplit('.', 1)[-1].lower() if '.' in file.filename else ''
+        if extension not in ALLOWED_EXTENSIONS:
+            raise ValueError(f"Unsupported image type: {file.filename}")
+
+        os.makedirs(self.staging_dir, exist_ok=True)
+        temp_path = os.path.join(self.staging_dir, f"incoming-{os.getpid()}-{threading.get_ident()}")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(temp_path, 'wb') as out:
+                for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b''):
+                    size += len(chunk)
+                    if size > MAX_IMAGE_BYTES:
+                        raise ValueError(f"Image too large: {file.filename} (max {MAX_IMAGE_BYTES // (1024 * 1024)} MB)")
+                    digest.update(chunk)
+                    out.write(chunk)
+            if size == 0:
+                raise ValueError(f"Empty image: {file.filename}")
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        digest = digest.hexdigest()
+        status = self.status(digest)
+        if status == 'ready':
+            # Already processed (same photo uploaded before); touch it so orphan GC restarts its grace period
+            os.remove(temp_path)
+            self.touch(digest)
+            self.stats['skipped'] += 1
+        else:
+            os.replace(temp_path, self._staging_path(digest))
+            self.stats['staged'] += 1
+            self._pool().submit(self._process, digest)
+            status = 'pending'
+
+        return {'digest': digest, 'status': status, 'urls': self.urls(digest)}
+
+    def _process(self, digest):
+        source = self._staging_path(digest)
+        try:
+            with Image.open(source) as image:
+                image.verify()
+                width, height = image.size
+            if width * height > MAX_IMAGE_PIXELS:
+                raise ValueError(f"Image too large: {width}x{height} pixels (max {MAX_IMAGE_PIXELS // 1_000_000} MP)")
+            with Image.open(source) as image:
+                # Bake in the EXIF rotation, then drop all metadata by re-encoding the pixels only
+                image = ImageOps.exif_transpose(image)
+                if image.mode in ('RGBA', 'LA', 'P'):
+                    image = image.convert('RGBA')
+                    background = Image.new('RGB', image.size, (255, 255, 255))
+                    background.paste(image, mask=image.getchannel('A'))
+                    image = background
+                else:
+                    image = image.convert('RGB')
+
+                os.makedirs(os.path.dirname(self.path(digest, 'full')), exist_ok=True)
+                # Largest first, so each smaller variant resizes from an already reduced copy
+                for variant, edge in sorted(VARIANTS.items(), key=lambda item: -item[1]):
+                    image.thumbnail((edge, edge), Image.LANCZOS)
+                    target = self.path(digest, variant)
+                    temp_target = f"{target}.tmp{os.getpid()}-{threading.get_ident()}"
+                    image.save(temp_target, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+                    os.replace(temp_target, target)
+            self.stats['processed'] += 1
+        except FileNotFoundError:
+            # Another worker picked up the same staged upload and already finished it
+            return
+        except Exception as e:
+            self.stats['failed'] += 1
+            print(f"❌ Image processing failed for {digest}: {e}")
+            try:
+                os.makedirs(os.path.dirname(self._failed_path(digest)), exist_ok=True)
+                with open(self._failed_path(digest), 'w') as f:
+                    f.write(str(e))
+            except OSError:
+                pass
+        finally:
+            try:
+                os.remove(source)
+            except FileNotFoundError:
+                pass
+
+    def touch(self, digest):
+        """Refresh the mtime of a blob's variants"""
+        for variant in VARIANTS:
+            try:
+                os.utime(self.path(digest, variant))
+            except FileNotFoundError:
+                pass
+
+    def status(self, digest):
+        """'ready', 'failed', 'pending' or 'unknown', from the files any worker can see"""
+        if all(os.path.exists(self.path(digest, variant)) for variant in VARIANTS):
+            return 'ready'
+        if os.path.exists(self._failed_path(digest)):
+            return 'failed'
+        if os.path.exists(self._staging_path(digest)):
+            return 'pending'
+        return 'unknown'
+
+    def recover(self):
+        """Requeue uploads left in staging by a restart; returns how many were queued"""
+        if not os.path.isdir(self.staging_dir):
+            return 0
+        queued = 0
+        for name in os.listdir(self.staging_dir):
+            digest, _, suffix = name.partition('.')
+            if suffix == 'upload' and DIGEST_PATTERN.match(digest):
+                self._pool().submit(self._process, digest)
+                queued += 1
+        return queued
+
+    def ingest_path(self, path):
+        """Process an existing file synchronously (legacy migration); returns its digest or None"""
+        digest = file_digest(path)
+        if self.status(digest) == 'ready':
+            self.touch(digest)
+        else:
+            os.makedirs(self.staging_dir, exist_ok=True)
+            shutil.copyfile(path, self._staging_path(digest))
+            self._process(digest)
+        return digest if self.status(digest) == 'ready' else None
+
+    def stored_digests(self):
+        """{digest: (bytes on disk, newest mtime)} for every blob (variants and failure markers)"""
+        blobs = {}
+        if not os.path.isdir(self.root):
+            return blobs
+        for shard in os.listdir(self.root):
+            shard_dir = os.path.join(self.root, shard)
+            if len(shard) != 2 or not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                digest = name[:64]
+                if not DIGEST_PATTERN.match(digest):
+                    continue
+                stat = os.stat(os.path.join(shard_dir, name))
+                size, mtime = blobs.get(digest, (0, 0))
+                blobs[digest] = (size + stat.st_size, max(mtime, stat.st_mtime))
+        return blobs
+
+    def remove(self, digest):
+        """Delete every file of a blob; returns bytes freed"""
+        freed = 0
+        shard_dir = os.path.join(self.root, digest[:2])
+        for path in [self.path(digest, variant) for variant in VARIANTS] + [self._failed_path(digest)]:
+            try:
+                freed += os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        try:
+            os.rmdir(shard_dir)
+        except OSError:
+            pass  # Shard still holds other blobs
+        return freed
+
+    def purge_staging(self, max_age_seconds):
+        """Remove partial uploads abandoned in staging (e.g. by a killed worker)"""
+        removed = 0
+        if not os.path.isdir(self.staging_dir):
+            return removed
+        cutoff = time.time() - max_age_seconds
+        for name in os.listdir(self.staging_dir):
+            path = os.path.join(self.staging_dir, name)
+            if name.startswith('incoming-') and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        return removed
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
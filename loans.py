@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Vectorized home-loan math for the loan calculator APIs.
+
+Everything is expressed as NumPy array operations (closed forms and
+cumulative sums), so full schedules and rate/tenure grids never loop in Python.
+"""
+
+import numpy as np
+
+MAX_TENURE_MONTHS = 40 * 12
+MAX_GRID_POINTS = 2500
+MAX_ANNUAL_RATE = 50.0  # Percent; anything above is a typo, not a home loan
+
+
+def validate_loan_terms(annual_rate, months):
+    """Raise ValueError for terms the EMI formulas cannot handle (zero/negative tenure, bad rates)"""
+    if not 0 < months <= MAX_TENURE_MONTHS:
+        raise ValueError(f'Tenure must be between 1 month and {MAX_TENURE_MONTHS // 12} years')
+    if not 0 <= annual_rate <= MAX_ANNUAL_RATE:
+        raise ValueError(f'Interest rate must be between 0 and {MAX_ANNUAL_RATE:g}%')
+
+
+def monthly_emi(principal, annual_rate, months):
+    """EMI for scalars or broadcastable arrays of principal, annual rate (%) and months"""
+    principal = np.asarray(principal, dtype=float)
+    rate = np.asarray(annual_rate, dtype=float) / 100 / 12
+    months = np.asarray(months, dtype=float)
+
+    growth = np.power(1 + rate, months)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        emi = principal * rate * growth / (growth - 1)
+    return np.where(rate > 0, emi, principal / months)
+
+
+def amortization_schedule(principal, annual_rate, months, prepayments=None, monthly_prepayment=0.0):
+    """Month-by-month schedule with optional lump-sum and recurring prepayments.
+
+    Prepayments keep the EMI fixed and shorten the tenure. ``prepayments`` maps
+    month number (1-based) to an extra amount paid that month.
+    """
+    rate = annual_rate / 100 / 12
+    emi = float(monthly_emi(principal, annual_rate, months))
+
+    k = np.arange(1, months + 1)
+    extra = np.full(months, float(monthly_prepayment))
+    for month, amount in (prepayments or {}).items():
+        if 1 <= month <= months:
+            extra[month - 1] += amount
+    payments = emi + extra
+
+    # B_k = (1+r)^k * (P - sum_{j<=k} pay_j * (1+r)^-j), one cumulative sum for the whole loan
+    if rate > 0:
+        growth = np.power(1 + rate, k)
+        balance = growth * (principal - np.cumsum(payments / growth))
+    else:
+        balance = principal - np.cumsum(payments)
+
+    # Stop at the month the loan is paid off; that month pays only what is left
+    paid_off = np.flatnonzero(balance <= 1e-6)
+    end = paid_off[0] + 1 if paid_off.size else months
+    balance = balance[:end]
+    opening = np.concatenate(([principal], balance[:-1]))
+    interest = opening * rate
+    payments = payments[:end].copy()
+    payments[-1] = min(payments[-1], opening[-1] + interest[-1])
+    principal_paid = payments - interest
+    balance = np.maximum(opening - principal_paid, 0)
+
+    return {
+        'month': k[:end],
+        'payment': payments,
+        'principal': principal_paid,
+        'interest': interest,
+        'balance': balance,
+        'emi': emi
+    }
+
+
+def schedule_summary(schedule, principal, months):
+    """Totals for a schedule, compared with the same loan without prepayments"""
+    total_interest = float(schedule['interest'].sum())
+    baseline_interest = float(schedule['emi'] * months - principal)
+    return {
+        'months': int(schedule['month'][-1]),
+        'total_paid': round(float(schedule['payment'].sum()), 2),
+        'total_interest': round(total_interest, 2),
+        'interest_saved': round(max(baseline_interest - total_interest, 0), 2),
+        'months_saved': int(months - schedule['month'][-1])
+    }
+
+
+def schedule_to_dict(schedule):
+    """JSON-ready columns, rounded to paise"""
+    return {
+        'month': schedule['month'].tolist(),
+        'payment': np.round(schedule['payment'], 2).tolist(),
+        'principal': np.round(schedule['principal'], 2).tolist(),
+        'interest': np.round(schedule['interest'], 2).tolist(),
+        'balance': np.round(schedule['balance'], 2).tolist()
+    }
+
+
+def rate_tenure_grid(principal, rates, tenures_years):
+    """EMI and total interest for every (rate, tenure) pair, rates as rows"""
+    rates = np.asarray(rates, dtype=float)[:, None]
+    months = np.asarray(tenures_years, dtype=float)[None, :] * 12
+    emi = monthly_emi(principal, rates, months)
+    return {
+        'rates': rates[:, 0].tolist(),
+        'tenures': np.asarray(tenures_years).tolist(),
+        'emi': np.round(emi, 2).tolist(),
+        'total_interest': np.round(emi * months - principal, 2).tolist()
+    }
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+In-memory text indexes over the location catalog.
+
+Built once in ``load_data`` so per-request lookups never rescan or re-lowercase
+the full ``locations`` list.
+"""
+
+import threading
+from collections import defaultdict, deque
+
+
+def trigrams(text):
+    """Padded character trigrams, so short words and word edges still produce grams"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LocationIndex:
+    """Prefix trie plus trigram index for ranked location autocomplete"""
+
+    def __init__(self, locations):
+        self.names = list(locations)
+        self.lowered = [name.lower() for name in self.names]
+        self._trie = {}
+        self._grams = defaultdict(set)
+        self._gram_counts = []
+
+        for i, lowered in enumerate(self.lowered):
+            # Index every word start so "lay" finds "BTM Layout"
+            for start in self._word_starts(lowered):
+                self._insert(lowered[start:], i, whole_name=start == 0)
+            grams = trigrams(lowered)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._grams[gram].add(i)
+
+    @staticmethod
+    def _word_starts(text):
+        return [i for i, ch in enumerate(text) if ch.isalnum() and (i == 0 or not text[i - 1].isalnum())]
+
+    def _insert(self, text, i, whole_name):
+        node = self._trie
+        for ch in text:
+            node = node.setdefault(ch, {})
+            bucket = node.setdefault('$names' if whole_name else '$words', [])
+            if not bucket or bucket[-1] != i:
+                bucket.append(i)
+
+    def _prefix(self, query):
+        node = self._trie
+        for ch in query:
+            node = node.get(ch)
+            if node is None:
+                return [], []
+        return node.get('$names', []), node.get('$words', [])
+
+    def _substring(self, query):
+        if len(query) < 3:
+            # Too short for trigram filtering, scan the pre-lowered names
+            return [i for i, lowered in enumerate(self.lowered) if query in lowered]
+        postings = sorted((self._grams.get(query[i:i + 3], set()) for i in range(len(query) - 2)), key=len)
+        candidates = set.intersection(*postings) if postings else set()
+        return [i for i in candidates if query in self.lowered[i]]
+
+    def _fuzzy(self, query, threshold=0.3):
+        query_grams = trigrams(query)
+        shared = defaultdict(int)
+        for gram in query_grams:
+            for i in self._grams.get(gram, ()):
+                shared[i] += 1
+        scored = []
+        for i, count in shared.items():
+            score = count / (len(query_grams) + self._gram_counts[i] - count)
+            if score >= threshold:
+                scored.append((-score, self.lowered[i], i))
+        return [i for _, _, i in sorted(scored)]
+
+    def search(self, query, limit=10, fuzzy=False):
+        """Ranked matches: exact, name prefix, word prefix, substring, then fuzzy (optional)"""
+        query = query.strip().lower()
+        if not query:
+            return self.names[:limit]
+
+        name_prefix, word_prefix = self._prefix(query)
+        substring = sorted(self._substring(query), key=lambda i: (self.lowered[i].find(query), self.lowered[i]))
+
+        ranked = []
+        seen = set()
+        groups = [[i for i in name_prefix if self.lowered[i] == query], name_prefix, word_prefix, substring]
+        if fuzzy and len(set(name_prefix) | set(word_prefix) | set(substring)) < limit:
+            groups.append(self._fuzzy(query))
+
+        for group in groups:
+            for i in group:
+                if i not in seen:
+                    seen.add(i)
+                    ranked.append(self.names[i])
+                    if len(ranked) >= limit:
+                        return ranked
+        return ranked
+
+
+class LocationMatcher:
+    """Aho-Corasick automaton that finds every location mention in one pass over a message"""
+
+    def __init__(self, locations=()):
+        self._names = {}
+        self._lock = threading.Lock()
+        for name in locations:
+            self._names.setdefault(name.strip().lower(), name.strip())
+        self._automaton = self._build(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name):
+        """Register a location (e.g. from a new listing); the automaton is rebuilt and swapped in"""
+        name = (name or '').strip()
+        if not name or name.lower() in self._names:
+            return False
+        with self._lock:
+            if name.lower() in self._names:
+                return False
+            names = dict(self._names)
+            names[name.lower()] = name
+            self._automaton = self._build(names)
+            self._names = names
+        return True
+
+    @staticmethod
+    def _build(names):
+        goto = [{}]
+        fail = [0]
+        output = [None]  # Pattern ending exactly at each state: (length, name)
+
+        for lowered, name in names.items():
+            state = 0
+            for ch in lowered:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    fail.append(0)
+                    output.append(None)
+                state = nxt
+            output[state] = (len(lowered), name)
+
+        # Breadth-first failure links (depth-1 states fail to the root);
+        # each state inherits the matches of its longest proper suffix state
+        suffix_outputs = [[] if out is None else [out] for out in output]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                suffix_outputs[nxt] = suffix_outputs[nxt] + suffix_outputs[fail[nxt]]
+
+        return goto, fail, suffix_outputs
+
+    def find_all(self, text):
+        """Whole-word location mentions as (start, end, name), longest first where they overlap"""
+        goto, fail, outputs = self._automaton
+        text = text.lower()
+        matches = []
+        state = 0
+        for end, ch in enumerate(text, 1):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, name in outputs[state]:
+                start = end - length
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    matches.append((start, end, name))
+
+        # Keep the longest mention among overlapping ones
+        selected = []
+        for start, end, name in sorted(matches, key=lambda m: (m[0] - m[1], m[0])):
+            if all(end <= s or start >= e for s, e, _ in selected):
+                selected.append((start, end, name))
+        return sorted(selected)
+
+    def longest(self, text):
+        """The longest location mentioned in text, or None"""
+        matches = self.find_all(text)
+        if not matches:
+            return None
+        return max(matches, key=lambda m: m[1] - m[0])[2]
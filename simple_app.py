@@ -4,12 +4,14 @@ Simple Real Estate AI Application - Minimal Working Version
 """
 
 from flask import Flask, render_template, request, jsonify, session
-import pandas as pd
 import numpy as np
 import joblib
 import os
 import json
 from datetime import datetime
+from dataset import LazyDataset, find_dataset_csv, unique_locations
+from search_index import LocationIndex
+from trends import TrendStore
 
 # Create Flask app
 app = Flask(__name__)
@@ -17,12 +19,14 @@ app.secret_key = 'real-estate-secret-key-2024'
 
 # Global variables for model and data
 model = None
-df = None
+dataset = None
 locations = []
+location_index = LocationIndex([])
+trend_store = TrendStore()
 
 def load_data():
     """Load model and data"""
-    global model, df, locations
+    global model, dataset, locations, location_index, trend_store
     
     try:
         # Load model
@@ -30,17 +34,15 @@ def load_data():
             model = joblib.load('model.pkl')
             print("✅ Model loaded successfully")
         
-        # Load data
-        if os.path.exists('housing.csv'):
-            df = pd.read_csv('housing.csv')
-            print("✅ Housing data loaded successfully")
-        elif os.path.exists('Bengaluru_House_Data.csv'):
-            df = pd.read_csv('Bengaluru_House_Data.csv')
-            print("✅ Bengaluru data loaded successfully")
+        # Load data (memory-mapped per column, only opened when first used)
+        csv_path = find_dataset_csv()
+        if csv_path:
+            dataset = LazyDataset(csv_path)
+            print(f"✅ {csv_path} mapped from {dataset.cache_dir}")
         
         # Extract locations
-        if df is not None and 'location' in df.columns:
-            locations = sorted(df['location'].unique().tolist())
+        if dataset is not None and 'location' in dataset:
+            locations = unique_locations(dataset)
         else:
             locations = [
                 "Electronic City Phase II", "Chikka Tirupathi", "Uttarahalli",
@@ -49,7 +51,11 @@ def load_data():
                 "Indiranagar", "Jayanagar", "BTM Layout", "HSR Layout"
             ]
         
+        location_index = LocationIndex(locations)
         print(f"✅ Loaded {len(locations)} locations")
+
+        # Same prebuilt trends as app.py (saved next to the dataset cache)
+        trend_store = TrendStore.for_dataset(dataset)
         
     except Exception as e:
         print(f"❌ Error loading data: {e}")
@@ -164,9 +170,11 @@ def api_locations():
 
 @app.route('/api/location-suggestions')
 def location_suggestions():
-    """Get location suggestions"""
-    query = request.args.get('q', '').lower()
-    suggestions = [loc for loc in locations if query in loc.lower()][:10]
+    """Get ranked location suggestions (prefix, substring, optional typo-tolerant)"""
+    query = request.args.get('q', '')
+    fuzzy = request.args.get('fuzzy', 'false').lower() in ('1', 'true', 'yes')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    suggestions = location_index.search(query, limit=limit, fuzzy=fuzzy)
     return jsonify({'success': True, 'suggestions': suggestions})
 
 @app.route('/history')
@@ -187,24 +195,13 @@ def trends():
 def api_trends(location):
     """Get trend data for a location"""
     try:
-        # Generate sample trend data
-        years = list(range(2018, 2025))
-        base_price = 75 + (hash(location) % 50)  # Base price varies by location
-
-        # Simulate price growth with some randomness
-        prices = []
-        current_price = base_price
-        for year in years:
-            growth_rate = 0.08 + (hash(f"{location}{year}") % 10) / 100  # 8-18% growth
-            current_price *= (1 + growth_rate)
-            prices.append(round(current_price, 2))
-
+        trend = trend_store.get(location)
         return jsonify({
             'success': True,
             'location': location,
             'trends': {
-                'years': years,
-                'prices': prices
+                'years': trend['years'],
+                'prices': trend['prices']
             }
         })
     except Exception as e:
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Helpers for serving files under /static with long-lived caching.
+
+Assets are fingerprinted by content so URLs can carry ``?v=<fingerprint>``
+and be cached as immutable; compressible text assets get precompressed
+``.br``/``.gz`` siblings that are picked by the request's Accept-Encoding.
+
+Precompress ahead of deployment with:
+    python static_assets.py static
+"""
+
+import os
+import sys
+import gzip
+import hashlib
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip siblings are still produced and served
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.mjs', '.json', '.svg', '.txt', '.html', '.xml', '.map', '.csv'}
+MIN_COMPRESS_BYTES = 1024
+ENCODING_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+
+def fingerprint(path):
+    """Short content hash of a file"""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def accepted_encodings(header):
+    """Content codings the client accepts (q=0 entries excluded)"""
+    accepted = set()
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def precompressed_variant(path, accept_encoding):
+    """(path, encoding) of the best precompressed sibling the client accepts, or (path, None)"""
+    accepted = accepted_encodings(accept_encoding)
+    for encoding, suffix in ENCODING_SUFFIXES:
+        if encoding in accepted or '*' in accepted:
+            candidate = path + suffix
+            # A sibling older than its source is stale and must not be served
+            if os.path.isfile(candidate) and os.path.getmtime(candidate) >= os.path.getmtime(path):
+                return candidate, encoding
+    return path, None
+
+
+def precompress_file(path):
+    """Write .gz (and .br when brotli is installed) siblings if they save space; returns files written"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return []
+
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+
+    written = []
+    for suffix, compressed in variants:
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+def precompress_tree(root):
+    """Precompress every compressible asset under root; returns files written"""
+    written = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                written.extend(precompress_file(os.path.join(directory, name)))
+    return written
+
+
+if __name__ == '__main__':
+    root = sys.argv[1] if len(sys.argv) > 1 else 'static'
+    written = precompress_tree(root)
+    print(f"✅ Wrote {len(written)} precompressed files under {root}" + ("" if brotli else " (gzip only, brotli not installed)"))
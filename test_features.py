@@ -64,6 +64,14 @@ def main():
             print(f"   💰 Predicted Price: {result.get('formatted_price')}")
             print(f"   📊 Dashboard Data: {'✅' if result.get('dashboard_data') else '❌'}")
     
+    # Test batch prediction API
+    batch_data = [prediction_data, dict(prediction_data, location="BTM Layout", size="2 BHK", total_sqft=1100)]
+    success, response = test_feature("Batch Prediction API", "/api/predict/batch", "POST", batch_data)
+    if success:
+        result = response.json()
+        if result.get('success'):
+            print(f"   📦 Priced {result.get('count')} properties, total ₹{result.get('total_value')} Lakhs")
+
     # Test trends API
     test_feature("Trends API", "/api/trends/Whitefield")
     
@@ -86,10 +94,29 @@ def main():
         result = response.json()
         if result.get('success'):
             print(f"   💳 EMI: {result.get('formatted_emi')}")
+
+    # Test amortization schedule with prepayment and rate grid
+    schedule_data = dict(loan_data, schedule=True, prepayments=[{"month": 12, "amount": 500000}],
+                         rate_grid={"rates": [7.5, 8.5, 9.5], "tenures": [10, 20, 30]})
+    success, response = test_feature("Loan Amortization API", "/api/loan-calculator", "POST", schedule_data)
+    if success:
+        result = response.json()
+        if result.get('success'):
+            summary = result['amortization']['summary']
+            print(f"   📅 Paid off in {summary['months']} months, interest saved ₹{summary['interest_saved']:,.0f}")
     
+    # Test affordability scoring
+    buyer_profile = {"monthly_income": 150000, "down_payment": 1500000, "rate": 8.5, "tenure": 20}
+    success, response = test_feature("Affordability API", "/api/affordability", "POST", buyer_profile)
+    if success:
+        result = response.json()
+        if result.get('success'):
+            print(f"   🏷️ {result.get('affordable_count')} of {result.get('total')} listings affordable")
+
     # Test location APIs
     test_feature("Locations API", "/api/locations")
     test_feature("Location Suggestions", "/api/location-suggestions?q=white")
+    test_feature("Fuzzy Location Suggestions", "/api/location-suggestions?q=koramagala&fuzzy=true")
     
     print("\n" + "=" * 50)
     print("🎉 Feature testing completed!")